@@ -3,7 +3,6 @@ import json
 import sys
 
 from bipelines.config import CommandConfig, RepoConfig, BipelineConfig, load_config_from_yaml, load_config_from_dict
-from bipelines.bipeline import Bipeline
 
 
 def parse_args():
@@ -26,6 +25,13 @@ def parse_args():
         dest="repos",
         help='Repo config as JSON: \'{"url":"...","branch":"main","install":"..."}\'',
     )
+    parser.add_argument(
+        "--repo-commit",
+        action="append",
+        dest="repo_commits",
+        metavar="NAME=SHA",
+        help="Pin a repo to a commit (repeatable; bipelines-launch --shards pins branch heads this way)",
+    )
     parser.add_argument(
         "--local-env-dir",
         type=str,
@@ -39,18 +45,96 @@ def parse_args():
         default=None,
         help="Beaker workspace (e.g. ai2/adaptability) for experiment deduplication",
     )
+    parser.add_argument(
+        "--dedup-lookup",
+        choices=["auto", "scan", "targeted"],
+        default=None,
+        help="How to find existing experiments: per-hash queries, a workspace scan, or auto (default)",
+    )
+    parser.add_argument(
+        "--dedup-key",
+        choices=["run", "content"],
+        default=None,
+        help="Dedup on command + run hash (run, default) or on command, repo commit, install and env (content)",
+    )
     parser.add_argument(
         "--run-hash", type=str, default="", help="Unique identifier for this batch of tasks"
     )
     parser.add_argument(
         "--state-dir", type=str, default=None, help="Directory to save run artifacts"
     )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=None,
+        help="Also rewrite the Beaker API metrics in state_dir every N seconds during the run",
+    )
+    parser.add_argument(
+        "--max-parallel",
+        type=int,
+        default=None,
+        help="Maximum number of tasks to run at once (default: 1)",
+    )
+    parser.add_argument(
+        "--on-failure",
+        choices=["abort", "continue"],
+        default=None,
+        help="On a failed task, stop launching new tasks (abort, default) or only skip its dependents (continue)",
+    )
+    parser.add_argument(
+        "--shard-index",
+        type=int,
+        default=None,
+        help="Which shard of the config this process launches (see --shard-count)",
+    )
+    parser.add_argument(
+        "--shard-count",
+        type=int,
+        default=None,
+        help="Split the config's tasks by hash across this many parent processes",
+    )
+    parser.add_argument(
+        "--shards-started",
+        type=float,
+        default=None,
+        help="Unix time the shards were launched; other shards' older experiments are from earlier runs",
+    )
+    parser.add_argument(
+        "--fork-server",
+        action="store_true",
+        default=False,
+        help="Run plain `python ...` launchers in children forked from a pre-imported interpreter per lib venv",
+    )
+    parser.add_argument(
+        "--dashboard",
+        choices=["auto", "live", "plain", "off"],
+        default=None,
+        help="Progress display: live panel, periodic plain-text lines, off, or auto (live on a terminal)",
+    )
+    parser.add_argument(
+        "--local-pool",
+        action="store_true",
+        default=False,
+        help="Run raw commands in a pool sized by this node's CPUs and memory, outside --max-parallel",
+    )
+    parser.add_argument(
+        "--echo-output",
+        action="store_true",
+        default=False,
+        help="Echo every line of command output to the console (default: only on failure)",
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
         default=False,
         help="Show what would happen without executing",
     )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        default=False,
+        help="Print the task table from local state only (no Beaker access, no credentials needed)",
+    )
 
     return parser.parse_args()
 
@@ -66,6 +150,7 @@ def main():
     if args.config_json or args.config:
         if args.commands:
             config.commands = [CommandConfig(command=c) for c in args.commands]
+            config.sweeps = []
         if args.dry_run:
             config.dry_run = True
         if args.state_dir:
@@ -76,6 +161,30 @@ def main():
             config.workspace = args.workspace
         if args.local_env_dir != ".bipelines":
             config.local_env_dir = args.local_env_dir
+        if args.metrics_interval is not None:
+            config.metrics_interval = args.metrics_interval
+        if args.max_parallel is not None:
+            config.max_parallel = args.max_parallel
+        if args.dedup_lookup:
+            config.dedup_lookup = args.dedup_lookup
+        if args.dedup_key:
+            config.dedup_key = args.dedup_key
+        if args.echo_output:
+            config.echo_output = True
+        if args.dashboard:
+            config.dashboard = args.dashboard
+        if args.on_failure:
+            config.on_failure = args.on_failure
+        if args.fork_server:
+            config.fork_server = True
+        if args.local_pool:
+            config.local_pool = True
+        if args.shard_count is not None:
+            config.shard_count = args.shard_count
+        if args.shard_index is not None:
+            config.shard_index = args.shard_index
+        if args.shards_started is not None:
+            config.shards_started = args.shards_started
     else:
         if not args.commands:
             print("Error: provide at least one --command or use --config", file=sys.stderr)
@@ -93,9 +202,41 @@ def main():
             run_hash=args.run_hash,
             local_env_dir=args.local_env_dir,
             state_dir=args.state_dir,
+            metrics_interval=args.metrics_interval,
             dry_run=args.dry_run,
+            max_parallel=args.max_parallel or 1,
+            dedup_lookup=args.dedup_lookup or "auto",
+            dedup_key=args.dedup_key or "run",
+            echo_output=args.echo_output,
+            dashboard=args.dashboard or "auto",
+            on_failure=args.on_failure or "abort",
+            fork_server=args.fork_server,
+            local_pool=args.local_pool,
+            shard_index=args.shard_index or 0,
+            shard_count=args.shard_count or 1,
+            shards_started=args.shards_started,
         )
 
+    for pin in args.repo_commits or []:
+        name, _, commit = pin.partition("=")
+        repo = config.repo_lookup.get(name)
+        if repo is None or not commit:
+            print(f"Error: --repo-commit {pin!r} must be NAME=SHA for a configured repo", file=sys.stderr)
+            sys.exit(1)
+        repo.commit = commit
+
+    # Once every override is applied, so bad CLI values fail here rather than mid-run.
+    config.validate()
+
+    if args.plan:
+        from bipelines.plan import print_plan
+
+        print_plan(config)
+        return
+
+    # Imported here so --plan never pays for beaker/rich.
+    from bipelines.bipeline import Bipeline
+
     bipeline = Bipeline(config)
     results = bipeline.run()
 
@@ -0,0 +1,204 @@
+import argparse
+import contextlib
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Deque, Optional, Tuple
+
+from rich.console import Console
+from rich.table import Table
+
+from bipelines.bipeline import TASK_TAG_ENV, Bipeline
+from bipelines.config import BipelineConfig, CommandConfig
+from bipelines.fake_beaker import FakeBeaker, SimClock
+from bipelines.scheduler import Task
+
+console = Console()
+
+WORKSPACE = "bench/workspace"
+
+
+class BenchBipeline(Bipeline):
+    """Bipeline whose launcher "commands" submit straight to a FakeBeaker."""
+
+    def __init__(
+        self,
+        config: BipelineConfig,
+        beaker: FakeBeaker,
+        launch_time: float,
+        tag_at_submit: bool = True,
+    ):
+        super().__init__(config, beaker=beaker)
+        self.launch_time = launch_time
+        self.tag_at_submit = tag_at_submit
+        # Scale the poller's real-time pacing along with the simulated clock.
+        self._poller.min_interval = beaker.clock.real_seconds(1.0)
+
+    def _launch_experiment(
+        self,
+        task: Task,
+        env: Optional[dict],
+        cwd: Optional[str],
+        log_path,
+        tail: Deque[str],
+    ) -> Tuple[str, str, str]:
+        self.beaker.clock.sleep(self.launch_time)
+        # A launcher that honours BIPELINES_TAG puts it in the description at creation.
+        description = env[TASK_TAG_ENV] if self.tag_at_submit else ""
+        exp_id = self.beaker.submit(name=f"bench-{task.index}", description=description)
+        return exp_id, f"{self.beaker.config.agent_address}/ex/{exp_id}", exp_id
+
+
+def _config(args, state_dir: str) -> BipelineConfig:
+    return BipelineConfig(
+        commands=[CommandConfig(command=f"python launch.py --point {i}") for i in range(args.tasks)],
+        workspace=WORKSPACE,
+        run_hash="bench",
+        state_dir=state_dir,
+        local_env_dir=state_dir,
+        max_parallel=args.max_parallel,
+        poll_interval=args.poll_interval / args.scale,
+        # The budget is in simulated time, like everything else.
+        api_rps=args.api_rps * args.scale if args.api_rps else None,
+    )
+
+
+def _fake(args) -> FakeBeaker:
+    return FakeBeaker(
+        clock=SimClock(scale=args.scale),
+        latency=args.latency,
+        queue_time=args.queue_time,
+        run_time=args.run_time,
+        failure_rate=0.0,
+        workspace_size=args.workspace_size,
+        seed=args.seed,
+    )
+
+
+@contextlib.contextmanager
+def _quiet():
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def _measure(fn: Callable[[], None], memory: bool) -> Tuple[float, Optional[int]]:
+    if memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        fn()
+    finally:
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if memory else None
+        if memory:
+            tracemalloc.stop()
+    return elapsed, peak
+
+
+def bench_startup(args) -> dict:
+    """Time the dedup cache build against a large workspace, cold and warm."""
+    results = {}
+    with tempfile.TemporaryDirectory() as state_dir:
+        beaker = _fake(args)
+        for phase in ("cold", "warm"):
+            beaker.calls.clear()
+            b = BenchBipeline(_config(args, state_dir), beaker, args.launch_time, args.tag_at_submit)
+            with _quiet():
+                elapsed, peak = _measure(b._build_workload_cache, memory=args.memory)
+            results[phase] = {
+                "wall_s": elapsed,
+                "api_calls": sum(beaker.calls.values()),
+                "peak_mem_bytes": peak,
+            }
+    return results
+
+
+def bench_run(args) -> dict:
+    """Run the whole pipeline end to end and compare against the ideal critical path."""
+    with tempfile.TemporaryDirectory() as state_dir:
+        beaker = _fake(args)
+        b = BenchBipeline(_config(args, state_dir), beaker, args.launch_time, args.tag_at_submit)
+        with _quiet():
+            elapsed, peak = _measure(b.run, memory=args.memory)
+
+        waves = -(-args.tasks // args.max_parallel)
+        ideal_sim = waves * (args.launch_time + args.queue_time + args.run_time)
+        ideal = beaker.clock.real_seconds(ideal_sim)
+        calls = sum(beaker.calls.values())
+        return {
+            "wall_s": elapsed,
+            "ideal_s": ideal,
+            "overhead_s": elapsed - ideal,
+            "api_calls": calls,
+            "api_calls_per_task": calls / max(args.tasks, 1),
+            "calls_by_method": dict(beaker.calls),
+            "peak_mem_bytes": peak,
+        }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark bipelines orchestration against an in-process fake Beaker"
+    )
+    parser.add_argument("--tasks", type=int, default=200, help="Number of commands in the config")
+    parser.add_argument("--workspace-size", type=int, default=10_000, help="Pre-existing workloads")
+    parser.add_argument("--max-parallel", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.1, help="Simulated seconds per RPC")
+    parser.add_argument("--launch-time", type=float, default=5.0, help="Simulated seconds per launcher")
+    parser.add_argument("--queue-time", type=float, default=60.0, help="Simulated queue seconds")
+    parser.add_argument("--run-time", type=float, default=600.0, help="Simulated run seconds")
+    parser.add_argument("--poll-interval", type=float, default=15.0, help="Simulated poll seconds")
+    parser.add_argument("--api-rps", type=float, default=10.0, help="Client-side API budget (0 = unlimited)")
+    parser.add_argument("--scale", type=float, default=1000.0, help="Simulated seconds per real second")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--untagged-launches",
+        dest="tag_at_submit",
+        action="store_false",
+        help="Simulate launchers that ignore BIPELINES_TAG, so bipelines has to tag afterwards",
+    )
+    parser.add_argument("--memory", action="store_true", help="Track peak Python memory (slower)")
+    parser.add_argument(
+        "--scenario", choices=["startup", "run", "all"], default="all", help="What to benchmark"
+    )
+    parser.add_argument("--json", type=str, default=None, help="Also write results to this file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = {"params": vars(args)}
+    if args.scenario in ("startup", "all"):
+        results["startup"] = bench_startup(args)
+    if args.scenario in ("run", "all"):
+        results["run"] = bench_run(args)
+
+    table = Table(title="bipelines benchmark", box=None)
+    table.add_column("Metric", style="cyan")
+    table.add_column("Value", justify="right")
+    for phase, r in results.get("startup", {}).items():
+        table.add_row(f"startup ({phase}) wall", f"{r['wall_s']:.3f}s")
+        table.add_row(f"startup ({phase}) API calls", str(r["api_calls"]))
+        if r["peak_mem_bytes"] is not None:
+            table.add_row(f"startup ({phase}) peak memory", f"{r['peak_mem_bytes'] / 2**20:.1f} MiB")
+    if "run" in results:
+        r = results["run"]
+        table.add_row("run wall", f"{r['wall_s']:.3f}s")
+        table.add_row("run ideal (critical path)", f"{r['ideal_s']:.3f}s")
+        table.add_row("run orchestration overhead", f"{r['overhead_s']:.3f}s")
+        table.add_row("run API calls / task", f"{r['api_calls_per_task']:.2f}")
+        for method, n in sorted(r["calls_by_method"].items()):
+            table.add_row(f"  {method}", str(n))
+        if r["peak_mem_bytes"] is not None:
+            table.add_row("run peak memory", f"{r['peak_mem_bytes'] / 2**20:.1f} MiB")
+    console.print(table)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
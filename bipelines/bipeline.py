@@ -1,21 +1,37 @@
+import itertools
 import json
 import re
+import threading
 import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-from beaker import Beaker
-from beaker import beaker_pb2 as pb2
+from beaker import Beaker, BeakerSortOrder
 from rich.console import Console
 from rich.table import Table
 
 from bipelines.config import CommandConfig, BipelineConfig
+from bipelines.dashboard import Dashboard
 from bipelines.experiment import (
-    get_experiment_status,
+    TERMINAL_STATUSES,
+    WORKLOAD_STATUS_DISPLAY,
     run_command_and_capture_experiment,
     run_raw_command,
 )
+from bipelines.forkserver import ForkServerPool
+from bipelines.index import DedupIndex, IndexEntry
+from bipelines.journal import RunJournal
+from bipelines.localpool import LocalPool
 from bipelines.local_env import setup_local_env, repo_venv_env
+from bipelines.metrics import ApiMetrics, InstrumentedBeaker
+from bipelines.poller import StatusPoller
+from bipelines.ratelimit import RetryPolicy, TokenBucket
+from bipelines.runner import get_runner
+from bipelines.scheduler import DagScheduler, Task
+from bipelines.status import FAILED_STATUSES
 
 console = Console()
 
@@ -40,18 +56,22 @@ def srule(*args, **kwargs):
 HASH_TAG_RE = re.compile(r"\(bipelines:([a-f0-9]+)\)\s*")
 HASH_TAG_SEARCH = "(bipelines:"
 
-WORKLOAD_STATUS_DISPLAY = {
-    pb2.WorkloadStatus.STATUS_SUBMITTED: "pending",
-    pb2.WorkloadStatus.STATUS_QUEUED: "pending",
-    pb2.WorkloadStatus.STATUS_INITIALIZING: "pending",
-    pb2.WorkloadStatus.STATUS_READY_TO_START: "pending",
-    pb2.WorkloadStatus.STATUS_RUNNING: "running",
-    pb2.WorkloadStatus.STATUS_STOPPING: "running",
-    pb2.WorkloadStatus.STATUS_UPLOADING_RESULTS: "running",
-    pb2.WorkloadStatus.STATUS_SUCCEEDED: "completed",
-    pb2.WorkloadStatus.STATUS_FAILED: "failed",
-    pb2.WorkloadStatus.STATUS_CANCELED: "canceled",
-}
+# Launchers see the task's hash and ready-made tag in these variables, so they
+# can put the tag in the experiment description when they create it.
+TASK_HASH_ENV = "BIPELINES_TASK_HASH"
+TASK_TAG_ENV = "BIPELINES_TAG"
+
+# Re-list this far behind the previous sync to catch workloads tagged shortly after creation.
+SYNC_OVERLAP = 3600.0
+
+# Index rows written per SQLite transaction during a sync.
+SYNC_BATCH_SIZE = 500
+
+# In `auto` dedup mode, look hashes up individually when at most this many need checking.
+TARGETED_LOOKUP_MAX = 32
+
+# Rows of the up-front task table; larger configs get a per-status summary for the rest.
+TASK_TABLE_ROWS = 50
 
 
 def _parse_hash_tag(description: str) -> Optional[str]:
@@ -60,29 +80,233 @@ def _parse_hash_tag(description: str) -> Optional[str]:
     return m.group(1) if m else None
 
 
+def _timestamp(ts) -> float:
+    """Seconds since the epoch of a protobuf Timestamp, without building a datetime."""
+    return ts.seconds + ts.nanos / 1e9
+
+
+def _batches(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    items = iter(items)
+    while batch := list(itertools.islice(items, size)):
+        yield batch
+
+
+def _hash_tag(task_hash: str) -> str:
+    return f"(bipelines:{task_hash})"
+
+
 class Bipeline:
-    def __init__(self, config: BipelineConfig):
+    def __init__(self, config: BipelineConfig, beaker: Optional[Beaker] = None):
         self.config = config
-        self.beaker = Beaker.from_env()
-        self._workload_cache: dict[str, pb2.Workload] = {}
+        self.metrics = ApiMetrics()
+        self.beaker = InstrumentedBeaker(
+            beaker,
+            self.metrics,
+            factory=Beaker.from_env,
+            limiter=TokenBucket(config.api_rps) if config.api_rps else None,
+            retry=RetryPolicy(attempts=config.api_retries),
+        )
+        self._workload_cache: dict[str, IndexEntry] = {}
+        self._index: Optional[DedupIndex] = None
+        self._journal: Optional[RunJournal] = None
+        self._resumed: Dict[str, IndexEntry] = {}
+        # Resolved repo commits, filled in after local setup (used by content dedup keys).
+        self._commits: Dict[str, str] = {}
+        # The workspace to list, resolved once per run (see _resolve_workspace).
+        self._workspace = config.workspace
+        self._started = time.time()
+        # Set on Ctrl-C: tasks still in flight stop waiting and nothing new is launched.
+        self._interrupted = threading.Event()
+        self._local_pool: Optional[LocalPool] = (
+            LocalPool(config.local_cpus, config.local_memory_gb, pin=config.pin_cpus)
+            if config.local_pool
+            else None
+        )
+        self._fork_servers: Optional[ForkServerPool] = (
+            ForkServerPool(config.fork_server_preload) if config.fork_server else None
+        )
+        self._poller = StatusPoller(
+            self.beaker,
+            workspace=config.workspace,
+            interval=config.poll_interval,
+            name_or_description=HASH_TAG_SEARCH,
+        )
+        self._dashboard = Dashboard(
+            console,
+            config.command_count,
+            mode=config.dashboard,
+            refresh=config.dashboard_refresh,
+            interval=config.progress_interval,
+        )
 
     # ── Beaker-based deduplication ──────────────────────────────────────
 
-    def _build_workload_cache(self):
-        """Pre-fetch all bipelines-tagged workloads from the Beaker workspace."""
+    def _build_workload_cache(
+        self, skip: Iterable[str] = (), hashes: Optional[Callable[[], Iterable[str]]] = None
+    ):
+        """Load the dedup entries for this config's hashes, refreshing them from Beaker first.
+
+        Hashes already recorded as completed in the on-disk index, or listed in
+        `skip` (resumed from the run journal), need no API calls. The rest are
+        either looked up one by one (`targeted`) or picked up by an incremental
+        scan of tagged workloads (`scan`); `auto` chooses targeted lookups for
+        small configs. `hashes` returns a fresh iterable of the hashes to load
+        (by default every command's task hash); it is streamed through the
+        index in batches, twice, rather than held.
+        """
         self._workload_cache = {}
         if not self.config.workspace:
             return
+        if self._index is None:
+            self._index = DedupIndex(self.config.index_path, self.config.workspace)
+        if hashes is None:
+            hashes = self._all_hashes
+
+        mode = self.config.dedup_lookup
+        skip = set(skip)
+        unresolved: List[str] = []
+        n_unresolved = 0
+        # Indexed as pending or running: a scan only re-lists recent workloads, so
+        # these are looked up again afterwards in case they have finished.
+        in_flight: List[str] = []
+        for batch in _batches(hashes(), SYNC_BATCH_SIZE):
+            known = self._index.get_many(batch)
+            for h in batch:
+                if h in skip or (h in known and known[h].status == "completed"):
+                    continue
+                if h in known and known[h].status not in TERMINAL_STATUSES:
+                    in_flight.append(h)
+                n_unresolved += 1
+                # Only targeted lookups need the hashes themselves.
+                if mode == "targeted" or n_unresolved <= TARGETED_LOOKUP_MAX:
+                    unresolved.append(h)
+
+        if mode == "auto":
+            mode = "targeted" if n_unresolved <= TARGETED_LOOKUP_MAX else "scan"
+
+        if mode == "targeted" and unresolved:
+            try:
+                self._lookup_hashes(list(dict.fromkeys(unresolved)))
+            except Exception as e:
+                sprint(f"  [dim]Targeted lookup failed ({e}); scanning workspace instead[/dim]")
+                mode = "scan"
+        if mode == "scan" and n_unresolved:
+            self._sync_index()
+            in_flight = [
+                h for h, e in self._index.get_many(in_flight).items()
+                if e.status not in TERMINAL_STATUSES
+            ]
+            if in_flight:
+                try:
+                    self._lookup_hashes(list(dict.fromkeys(in_flight)))
+                except Exception as e:
+                    sprint(f"  [dim]Warning: could not refresh in-flight experiments: {e}[/dim]")
+
+        for batch in _batches(hashes(), SYNC_BATCH_SIZE):
+            self._workload_cache.update(self._index.get_many(batch))
+
+    def _all_hashes(self) -> Iterator[str]:
+        return (self._task_hash(cmd) for cmd in self.config.iter_commands())
+
+    def _lookup_hashes(self, hashes: list[str]):
+        """Query Beaker for just the given hashes and record the newest match for each.
+
+        A workload matches when its description carries the `(bipelines:<hash>)`
+        tag or its name contains the hash, so experiments named after their task
+        hash are found as well as older, description-tagged ones.
+        """
+
+        def lookup(task_hash: str):
+            for w in self.beaker.workload.list(
+                workspace=self._workspace,
+                name_or_description=task_hash,
+                sort_order=BeakerSortOrder.descending,
+            ):
+                tagged = _parse_hash_tag(w.experiment.description or "") == task_hash
+                if tagged or task_hash in (w.experiment.name or ""):
+                    # Results are newest first.
+                    return (
+                        task_hash,
+                        w.experiment.id,
+                        WORKLOAD_STATUS_DISPLAY.get(w.status, "unknown"),
+                        _timestamp(w.experiment.created),
+                    )
+            return None
+
+        with ThreadPoolExecutor(max_workers=min(8, len(hashes))) as pool:
+            rows = [future.result() for future in [pool.submit(lookup, h) for h in hashes]]
+        self._index.upsert_many(row for row in rows if row is not None)
+
+    def _sync_index(self):
+        """Sync bipelines-tagged workloads into the on-disk index.
+
+        Only workloads created since the previous sync (minus a safety overlap)
+        are listed, so the cost tracks what changed rather than the size of the
+        workspace. Status changes of older workloads aren't seen here; the
+        caller looks up the in-flight ones it needs individually. A workload
+        tagged more than SYNC_OVERLAP after it was created is missed too.
+        """
+        last_sync = self._index.last_sync()
+        created_after = None
+        if last_sync is not None:
+            created_after = datetime.fromtimestamp(last_sync - SYNC_OVERLAP, tz=timezone.utc)
+
+        sync_started = time.time()
+        seen = 0
+        batch = []
         try:
             for w in self.beaker.workload.list(
-                workspace=self.config.workspace,
+                workspace=self._workspace,
                 name_or_description=HASH_TAG_SEARCH,
+                created_after=created_after,
             ):
                 task_hash = _parse_hash_tag(w.experiment.description or "")
-                if task_hash and task_hash not in self._workload_cache:
-                    self._workload_cache[task_hash] = w
+                if task_hash:
+                    batch.append((
+                        task_hash,
+                        w.experiment.id,
+                        WORKLOAD_STATUS_DISPLAY.get(w.status, "unknown"),
+                        _timestamp(w.experiment.created),
+                    ))
+                    seen += 1
+                if len(batch) >= SYNC_BATCH_SIZE:
+                    self._index.upsert_many(batch)
+                    batch = []
+            self._index.upsert_many(batch)
+            self._index.mark_synced(sync_started)
         except Exception as e:
             sprint(f"  [dim]Warning: could not query Beaker workspace: {e}[/dim]")
+            # Keep what was listed before the failure.
+            try:
+                self._index.upsert_many(batch)
+            except Exception as e:
+                sprint(f"  [dim]Warning: could not update dedup index: {e}[/dim]")
+
+        if last_sync is not None:
+            sprint(f"  [dim]Synced {seen} new tagged workload(s) into {self.config.index_path}[/dim]")
+
+    def _resolve_workspace(self):
+        """Resolve the configured workspace name once.
+
+        Given an "org/name" string, every `workload.list` first resolves it
+        with an RPC of its own; the resolved workspace saves that call on
+        each poll, lookup and sync page. Falls back to the name if it can't
+        be resolved.
+        """
+        try:
+            return self.beaker.workspace.get(self.config.workspace)
+        except Exception as e:
+            sprint(f"  [dim]Warning: could not resolve workspace {self.config.workspace}: {e}[/dim]")
+            return self.config.workspace
+
+    def _record_experiment(self, task_hash: str, experiment_id: str, status: str):
+        """Keep the dedup index current with experiments this run launches or follows."""
+        if self._index is None:
+            return
+        try:
+            self._index.upsert(task_hash, experiment_id, status)
+        except Exception as e:
+            sprint(f"  [dim]Warning: could not update dedup index: {e}[/dim]")
 
     def _tag_experiment(self, experiment_id: str, task_hash: str):
         """Prepend the bipelines hash tag to the experiment description, preserving any original text.
@@ -94,7 +318,7 @@ class Bipeline:
             workload = self.beaker.workload.get(experiment_id)
             current_desc = workload.experiment.description or ""
             original = HASH_TAG_RE.sub("", current_desc, count=1)
-            new_desc = f"(bipelines:{task_hash}) {original}".rstrip()
+            new_desc = f"{_hash_tag(task_hash)} {original}".rstrip()
             if new_desc != current_desc:
                 self.beaker.workload.update(workload, description=new_desc)
         except Exception as e:
@@ -102,34 +326,169 @@ class Bipeline:
 
     def _wait_for_experiment(
         self,
+        task: Task,
         experiment_id: str,
-        task_hash: str,
-        poll_interval: float = 15.0,
-        retag_every: int = 4,
+        created: Optional[datetime] = None,
     ) -> str:
-        """Poll a Beaker experiment until terminal, re-tagging the description periodically."""
+        """Follow a Beaker experiment through the shared poller until terminal.
+
+        Launchers are expected to tag the experiment at creation (see
+        TASK_TAG_ENV); the description is only re-tagged when a poll shows the
+        tag missing, or once at the end if the poller never saw the description.
+        """
         last_status = None
-        polls = 0
+        tick = 0
+        task.experiment_id = experiment_id
 
+        self._poller.watch(experiment_id, created=created)
+        try:
+            while True:
+                status, tick = self._poller.wait(experiment_id, tick)
+
+                if status != last_status:
+                    self._log(task, f"Status: [yellow]{status}[/yellow]")
+                    self._dashboard.task_status(task, status)
+                    self._journal_record(task.hash, "status", experiment_id=experiment_id, status=status)
+                    last_status = status
+
+                description = self._poller.description(experiment_id)
+                if description is not None:
+                    if _parse_hash_tag(description) != task.hash:
+                        self._tag_experiment(experiment_id, task.hash)
+                elif status in TERMINAL_STATUSES:
+                    self._tag_experiment(experiment_id, task.hash)
+
+                if status in TERMINAL_STATUSES:
+                    self._record_experiment(task.hash, experiment_id, status)
+                    return status
+        finally:
+            self._poller.unwatch(experiment_id)
+
+    # ── Sharding ───────────────────────────────────────────────────────
+
+    def _followed_tasks(self, dependencies: Callable[[CommandConfig], List[int]]) -> Set[int]:
+        """Indices of tasks owned by other shards that this shard's own tasks depend on.
+
+        Only tasks named in some `after` can be followed, so this walks the
+        config's commands and sweeps rather than every sweep point: a sweep
+        counts as needed once any of its points is owned here or followed.
+        Followed tasks are never launched (see `_follow_other_shard`); the
+        rest of the config is left to the other shards.
+        """
+        cfg = self.config
+        if cfg.shard_count == 1:
+            return set()
+        offsets = cfg._sweep_offsets()
+        owned_sweeps = [
+            any(cfg.owns(self._task_hash(cmd)) for cmd in sweep.expand()) for sweep in cfg.sweeps
+        ]
+        targets = {
+            i: not cfg.owns(self._task_hash(cfg.command_at(i)))
+            for cmd in [*cfg.commands, *cfg.sweeps]
+            for i in dependencies(cmd)
+        }
+        followed: Set[int] = set()
         while True:
-            status = get_experiment_status(self.beaker, experiment_id)
-
-            if status != last_status:
-                sprint(f"  Status: [yellow]{status}[/yellow]")
-                last_status = status
-
-            if status in ("completed", "failed", "canceled"):
-                self._tag_experiment(experiment_id, task_hash)
-                return status
-
-            polls += 1
-            if polls % retag_every == 0:
-                self._tag_experiment(experiment_id, task_hash)
-
-            time.sleep(poll_interval)
+            needed = set(followed)
+            for i, cmd in enumerate(cfg.commands):
+                if i in followed or cfg.owns(self._task_hash(cmd)):
+                    needed.update(dependencies(cmd))
+            for sweep, offset, owned in zip(cfg.sweeps, offsets, owned_sweeps):
+                if owned or any(offset <= i < offset + len(sweep) for i in followed):
+                    needed.update(dependencies(sweep))
+            grown = {i for i in needed if targets.get(i)}
+            if grown == followed:
+                return followed
+            followed = grown
+
+    def _follow_other_shard(self, task: Task) -> str:
+        """Wait for the shard that owns `task` to launch it, then follow its experiment.
+
+        Shards find each other's experiments through the `(bipelines:<hash>)`
+        tag. Failures from before the shards were launched (`shards_started`)
+        are left over from earlier runs, and the owner re-runs them, so they
+        are waited out. A failure from this run is final once the owner has
+        used up the command's retries. If the owner launches nothing new for
+        `shard_wait_timeout` seconds (it aborted, or skipped the task after an
+        upstream failure), the task is reported as skipped.
+        """
+        cfg = self.config
+        cmd = task.command
+        owner = int(task.hash, 16) % cfg.shard_count
+        since = cfg.shards_started if cfg.shards_started is not None else self._started
+        retry_on = cmd.retry_on or ["failed"]
+        finished = set()
+        failures = 0
+        waiting_since = time.monotonic()
+        self._log(task, f"[dim]Launched by shard {owner}; waiting for its experiment...[/dim]")
+        self._dashboard.task_status(task, "other shard")
+        while True:
+            entry = self._workload_cache.get(task.hash)
+            if entry is not None and entry.experiment_id not in finished:
+                status = entry.status
+                if status not in TERMINAL_STATUSES:
+                    created = datetime.fromtimestamp(entry.created, tz=timezone.utc)
+                    try:
+                        status = self._wait_for_experiment(task, entry.experiment_id, created=created)
+                    except Exception as e:
+                        self._log(task, f"[dim]Could not follow experiment: {e}[/dim]")
+                        status = None
+                if status == "completed":
+                    self._log(task, "[green]Completed by its shard.[/green]")
+                    return "completed"
+                if status is not None:
+                    finished.add(entry.experiment_id)
+                    waiting_since = time.monotonic()
+                    if entry.created >= since:
+                        failures += 1
+                        if status not in retry_on or failures > cmd.retries:
+                            self._log(task, f"[red]Ended with status {status} on shard {owner}.[/red]", always=True)
+                            return status
+                        self._log(task, f"[dim]Attempt {failures} {status}; waiting for shard {owner} to retry...[/dim]")
+
+            if (
+                cfg.shard_wait_timeout is not None
+                and time.monotonic() - waiting_since > cfg.shard_wait_timeout
+            ):
+                self._log(
+                    task,
+                    f"[yellow]Shard {owner} launched nothing new in {cfg.shard_wait_timeout:.0f}s; "
+                    f"giving up on it.[/yellow]",
+                    always=True,
+                )
+                return "skipped"
+
+            if self._interrupted.wait(cfg.poll_interval):
+                return "skipped"
+            try:
+                self._lookup_hashes([task.hash])
+                entry = self._index.get_many([task.hash]).get(task.hash)
+            except Exception as e:
+                self._log(task, f"[dim]Could not look up experiment: {e}[/dim]")
+                continue
+            if entry is not None:
+                self._workload_cache[task.hash] = entry
 
     # ── Main loop ──────────────────────────────────────────────────────
 
+    def _tasks(
+        self, dependencies: Callable[[CommandConfig], List[int]], followed: Set[int]
+    ) -> Iterator[Task]:
+        """Every task in config order. Tasks for other shards arrive already `other_shard`."""
+        cfg = self.config
+        for i, cmd in enumerate(cfg.iter_commands()):
+            task_hash = self._task_hash(cmd)
+            owned = cfg.owns(task_hash)
+            yield Task(
+                index=i,
+                command=cmd,
+                hash=task_hash,
+                deps=dependencies(cmd),
+                status=None if owned or i in followed else "other_shard",
+                # Raw commands leave nothing on Beaker to follow, so every shard that needs one runs it.
+                follow=not owned and not cmd.raw,
+            )
+
     def run(self) -> list[dict]:
         """Execute all tasks and return a list of result dicts.
 
@@ -141,183 +500,513 @@ class Bipeline:
         sprint("[bold]Bipelines[/bold]")
         sprint(f"  Run hash:   {cfg.run_hash or '(none)'}")
         sprint(f"  Workspace:  {cfg.workspace or '(none — dedup disabled)'}")
-        sprint(f"  Commands:   {len(cfg.commands)}")
+        sprint(f"  Commands:   {cfg.command_count}")
         if cfg.repos:
             sprint(f"  Repos:      {len(cfg.repos)} (local install)")
+        if cfg.max_parallel > 1:
+            sprint(f"  Parallel:   up to {cfg.max_parallel} tasks at once")
+        if cfg.dedup_key == "content":
+            sprint("  Dedup key:  content (command, repo commit, install, env)")
+        if self._local_pool is not None:
+            pool = self._local_pool
+            memory = f", {pool.memory_gb:.0f} GB" if pool.memory_gb is not None else ""
+            pinned = ", pinned" if pool.pin else ""
+            sprint(f"  Local pool: {pool.cpus} CPUs{memory}{pinned} for raw commands")
+        if cfg.limits:
+            limits = ", ".join(f"{k}={n}" for k, n in sorted(cfg.shard_limits.items()))
+            share = " (this shard's share)" if cfg.shard_count > 1 else ""
+            sprint(f"  Limits:     {limits} in flight{share}")
+        if cfg.shard_count > 1:
+            sprint(f"  Shard:      {cfg.shard_index} of {cfg.shard_count}")
         if cfg.dry_run:
             sprint("  [yellow]DRY RUN — commands will not be executed[/yellow]")
         sprint()
 
-        if cfg.workspace:
-            sprint("[dim]Fetching existing experiments from Beaker...[/dim]")
-            self._build_workload_cache()
-
+        # Repos come first: content dedup keys depend on the commits they resolve to.
         if cfg.repos:
             srule("[bold]Setting up local environment[/bold]")
-            setup_local_env(cfg.repos, env_dir=cfg.local_env_dir)
+            setup_local_env(cfg.repos, env_dir=cfg.local_env_dir, max_workers=cfg.setup_workers)
             sprint()
+            if cfg.dedup_key == "content":
+                self._commits = cfg.resolved_commits()
+
+        self._started = time.time()
+        dependencies = cfg.dependency_resolver()
+        followed = self._followed_tasks(dependencies)
+        if cfg.shard_count > 1:
+            owned = sum(1 for h in self._all_hashes() if cfg.owns(h))
+            self._dashboard.total = owned + len(followed)
+            sprint(
+                f"[dim]This shard launches {owned} of {cfg.command_count} task(s) and follows "
+                f"{len(followed)} owned by other shards[/dim]"
+            )
+
+        self._resumed = self._open_journal()
+        if cfg.workspace:
+            self._workspace = self._poller.workspace = self._resolve_workspace()
+            sprint("[dim]Fetching existing experiments from Beaker...[/dim]")
+            self._build_workload_cache(
+                skip=self._resumed,
+                hashes=lambda: (t.hash for t in self._tasks(dependencies, followed) if t.status is None),
+            )
+        # This run's own experiments take precedence over whatever the index holds.
+        self._workload_cache.update(self._resumed)
 
         self._print_task_table()
 
-        results = []
-        failed = False
-        for i, cmd in enumerate(cfg.commands):
-            task_hash = cfg.task_hash(cmd)
-            status = self._process_task(i, cmd, task_hash)
-            results.append({"command": cmd.command, "hash": task_hash, "status": status})
-
-            if status in ("failed", "canceled"):
-                sprint()
-                srule("[bold red]Pipeline aborted[/bold red]")
-                sprint()
-                failed = True
-                break
-
-        if not failed:
-            sprint()
+        # Hashed and resolved as the scheduler pulls them, so a large sweep is never held whole.
+        tasks = self._tasks(dependencies, followed)
+        scheduler = DagScheduler(
+            tasks,
+            max_parallel=cfg.max_parallel,
+            limits=cfg.shard_limits,
+            on_failure=cfg.on_failure,
+            local_pool=self._local_pool,
+        )
+        stop_metrics = None
+        if cfg.state_dir and cfg.metrics_interval:
+            stop_metrics = self.metrics.write_every(
+                Path(cfg.state_dir), self._metrics_stem(), cfg.metrics_interval
+            )
+        try:
+            with self._dashboard:
+                scheduler.run(
+                    self._run_task, on_error=self._on_task_error, on_interrupt=self._interrupt
+                )
+                self._dashboard.settle(scheduler.tasks)
+        finally:
+            self._poller.stop()
+            if self._journal is not None:
+                self._journal.close()
+            if self._fork_servers is not None:
+                self._fork_servers.close()
+            if stop_metrics is not None:
+                stop_metrics.set()
+        results = [
+            {"command": t.command.command, "hash": t.hash, "status": t.status, "attempts": t.attempts}
+            for t in scheduler.tasks
+        ]
+
+        failed = sum(1 for r in results if r["status"] in FAILED_STATUSES)
+        skipped = sum(1 for r in results if r["status"] == "skipped")
+        sprint()
+        if scheduler.aborted:
+            srule("[bold red]Pipeline aborted[/bold red]")
+        elif failed:
+            srule("[bold yellow]All tasks finished, some failed[/bold yellow]")
+        else:
             srule("[bold green]All tasks completed[/bold green]")
+        if failed or skipped:
+            sprint()
+        if failed:
+            sprint(f"  Failed:    {failed}/{len(results)}")
+        if skipped:
+            sprint(f"  Skipped:   {skipped}/{len(results)}")
+        retried = sum(1 for r in results if len(r["attempts"]) > 1)
+        if retried:
+            sprint(f"  Retried:   {retried}/{len(results)}")
 
         completed = sum(1 for r in results if r["status"] == "completed")
-        sprint(f"  Completed: {completed}/{len(cfg.commands)}")
+        sprint(f"  Completed: {completed}/{len(results)}")
+        self._print_api_summary()
         sprint()
 
         if cfg.state_dir:
             self._write_artifact(
-                f"run-{cfg.run_hash or 'default'}.json",
+                f"run-{cfg.run_stem}.json",
                 {"run_hash": cfg.run_hash, "tasks": results},
             )
+            try:
+                self.metrics.write(Path(cfg.state_dir), self._metrics_stem())
+            except OSError as e:
+                sprint(f"  [dim]Warning: could not write API metrics: {e}[/dim]")
 
         return results
 
+    def _interrupt(self):
+        """Unblock every task in flight: stop polling and kill the commands still running."""
+        self._interrupted.set()
+        self._poller.stop()
+        get_runner().cancel_all()
+        if self._fork_servers is not None:
+            self._fork_servers.terminate()
+
+    # ── Run journal ────────────────────────────────────────────────────
+
+    def _open_journal(self) -> Dict[str, IndexEntry]:
+        """Open this run's journal and replay it. Returns the experiments to resume, by hash."""
+        path = self.config.journal_path
+        if path is None:
+            return {}
+        self._journal = RunJournal(path)
+        try:
+            replayed = self._journal.replay()
+        except OSError as e:
+            sprint(f"  [dim]Warning: could not read run journal: {e}[/dim]")
+            return {}
+        # Raw commands have no experiment to re-attach to and always re-run.
+        resumed = {}
+        if replayed:
+            for cmd in self.config.iter_commands():
+                task_hash = self._task_hash(cmd)
+                if not cmd.raw and task_hash in replayed:
+                    resumed[task_hash] = replayed[task_hash]
+        if resumed:
+            in_flight = sum(1 for e in resumed.values() if e.status not in TERMINAL_STATUSES)
+            sprint(
+                f"[dim]Resuming from {path}: {len(resumed)} task(s) recorded, "
+                f"{in_flight} still in flight[/dim]"
+            )
+        return resumed
+
+    def _journal_record(self, task_hash: str, event: str, **fields):
+        if self._journal is None:
+            return
+        try:
+            self._journal.record(task_hash, event, **fields)
+        except OSError as e:
+            sprint(f"  [dim]Warning: could not write run journal: {e}[/dim]")
+
     # ── Per-task logic ─────────────────────────────────────────────────
 
-    def _process_task(self, index: int, cmd: CommandConfig, task_hash: str) -> str:
+    @property
+    def _concurrent(self) -> bool:
+        """Whether several tasks may print at once (raw commands in the local pool run beside the rest)."""
+        return self.config.max_parallel > 1 or self._local_pool is not None
+
+    @property
+    def _quiet(self) -> bool:
+        """Whether the dashboard reports progress, so per-task output is limited to failures and retries."""
+        return self._dashboard.mode != "off"
+
+    def _log(self, task: Task, message: str = "", always: bool = False):
+        """Print a task-scoped line, prefixed with the task label when tasks run concurrently.
+
+        With the dashboard on, only `always` lines (failures and retries) are
+        printed, and they always carry the label.
+        """
+        if self._quiet and not always:
+            return
+        if self._concurrent or self._quiet:
+            sprint(f"  [cyan]\\[{task.label}][/cyan] {message}")
+        else:
+            sprint(f"  {message}")
+
+    def _task_hash(self, cmd: CommandConfig) -> str:
+        return self.config.task_hash(cmd, self._commits)
+
+    def _output_prefix(self, task: Task) -> str:
+        """Plain-text prefix for a task's command output lines."""
+        return f"[{task.label}] " if self._concurrent else ""
+
+    def _on_task_error(self, task: Task, error: Exception):
+        self._log(task, f"[red]Error: {error}[/red]", always=True)
+
+    def _run_task(self, task: Task) -> str:
+        self._dashboard.task_started(task)
+        status = "failed"
+        try:
+            status = self._run_attempt(task)
+        finally:
+            if task.not_before is None:
+                self._dashboard.task_finished(task, status)
+        if task.not_before is None:
+            self._journal_record(task.hash, "finished", status=status)
+        return status
+
+    def _run_attempt(self, task: Task) -> str:
+        """Run one attempt of the task, scheduling a retry if its status is in `retry_on`.
+
+        A retry waits `retry_backoff * 2**n` seconds in the scheduler, not in
+        this worker. It keeps the task's hash and re-launches, because the
+        failed experiment it leaves behind is never reused. Tasks followed for
+        another shard are never retried here; the owning shard retries them.
+        """
+        cmd = task.command
+        retry_on = cmd.retry_on or ["failed"]
+        task.experiment_id = None
+        task.process = None
+        started = time.time()
+        status = self._process_task(task)
+        attempt = {
+            "attempt": len(task.attempts) + 1,
+            "status": status,
+            "experiment_id": task.experiment_id,
+            "started": started,
+            "finished": time.time(),
+        }
+        if task.process is not None:
+            attempt["process"] = task.process
+        task.attempts.append(attempt)
+        retries_left = cmd.retries - (len(task.attempts) - 1)
+        if task.follow or status not in retry_on or retries_left <= 0:
+            return status
+
+        delay = cmd.retry_backoff * 2 ** (len(task.attempts) - 1)
+        self._log(
+            task,
+            f"[yellow]Attempt {len(task.attempts)} {status}; retrying in {delay:.1f}s "
+            f"({retries_left} retr{'y' if retries_left == 1 else 'ies'} left)[/yellow]",
+            always=True,
+        )
+        self._journal_record(
+            task.hash, "retry", attempt=len(task.attempts), status=status,
+            experiment_id=task.experiment_id,
+        )
+        self._dashboard.task_status(task, f"retry {len(task.attempts)}")
+        self._workload_cache.pop(task.hash, None)
+        task.not_before = time.monotonic() + delay
+        return status
+
+    def _process_task(self, task: Task) -> str:
         cfg = self.config
-        total = len(cfg.commands)
+        cmd = task.command
+        total = cfg.command_count
 
-        srule(f"Task {index + 1}/{total}")
-        sprint(f"  Command: {cmd.command}")
+        if not self._quiet:
+            srule(f"Task {task.index + 1}/{total}")
+        self._log(task, f"Command: {cmd.command}")
         if cmd.lib:
-            sprint(f"  Lib:     {cmd.lib}")
+            self._log(task, f"Lib:     {cmd.lib}")
         if cmd.raw:
-            sprint("  Mode:    [dim]raw[/dim]")
-        sprint(f"  Hash:    {task_hash}")
+            self._log(task, "Mode:    [dim]raw[/dim]")
+        self._log(task, f"Hash:    {task.hash}")
+
+        if task.follow:
+            return self._follow_other_shard(task)
 
         if not cmd.raw:
-            cached = self._workload_cache.get(task_hash)
+            cached = self._workload_cache.get(task.hash)
             if cached is not None:
-                result = self._check_existing_experiment(cached, task_hash)
+                result = self._check_existing_experiment(task, cached)
                 if result is not None:
                     return result
 
         if cfg.dry_run:
-            sprint("  [dim]Dry run — would execute command[/dim]")
+            self._log(task, "[dim]Dry run — would execute command[/dim]")
             return "dry_run"
+        if self._interrupted.is_set():
+            return "skipped"
 
         cwd = str(cfg.repo_dir(cmd.lib)) if cmd.lib else None
-        env = repo_venv_env(cfg.repo_dir(cmd.lib)) if cmd.lib else None
+        env = (
+            repo_venv_env(cfg.repo_dir(cmd.lib), env_dir=Path(cfg.local_env_dir).resolve())
+            if cmd.lib
+            else None
+        )
+
+        env = {**(env or {}), TASK_HASH_ENV: task.hash, TASK_TAG_ENV: _hash_tag(task.hash)}
 
         if cmd.raw:
-            return self._run_raw(cmd, cwd=cwd, env=env)
+            return self._run_raw(task, cwd=cwd, env=env)
 
-        sprint("  [cyan]Running locally...[/cyan]")
+        self._log(task, "[cyan]Running locally...[/cyan]")
+        self._dashboard.task_status(task, "launching")
+        tail: Deque[str] = deque(maxlen=cfg.log_tail_lines)
+        log_path = cfg.logs_dir / f"{task.hash}.log"
         try:
-            exp_name, url, exp_id = run_command_and_capture_experiment(
-                command=cmd.command,
-                env=env,
-                cwd=cwd,
-            )
+            exp_name, url, exp_id = self._launch_experiment(task, env, cwd, log_path, tail)
         except RuntimeError as e:
-            sprint(f"  [red]Error: {e}[/red]")
+            self._log(task, f"[red]Error: {e}[/red]", always=True)
+            self._print_tail(task, tail, log_path)
             return "failed"
 
-        sprint(f"  Experiment: [cyan]{exp_name}[/cyan]")
-        sprint(f"  URL: [link={url}]{url}[/link]")
+        self._log(task, f"Experiment: [cyan]{exp_name}[/cyan]")
+        self._log(task, f"URL: [link={url}]{url}[/link]")
+        self._dashboard.task_status(task, "launched", url=url)
 
-        self._tag_experiment(exp_id, task_hash)
+        self._journal_record(task.hash, "launched", experiment_id=exp_id, created=time.time())
+        self._record_experiment(task.hash, exp_id, "pending")
 
-        final = self._wait_for_experiment(exp_id, task_hash)
+        final = self._wait_for_experiment(task, exp_id)
 
         if final == "completed":
-            sprint("  [green]Task completed successfully.[/green]")
+            self._log(task, "[green]Task completed successfully.[/green]")
         else:
-            sprint(f"  [red]Task ended with status: {final}[/red]")
+            self._log(task, f"[red]Task ended with status: {final}[/red]", always=True)
 
         return final
 
+    def _launch_experiment(
+        self,
+        task: Task,
+        env: Optional[dict],
+        cwd: Optional[str],
+        log_path: Path,
+        tail: Deque[str],
+    ) -> Tuple[str, str, str]:
+        """Run the task's launcher command. Returns (experiment_name, url, experiment_id)."""
+        fork_server = None
+        if self._fork_servers is not None and task.command.lib and env is not None:
+            fork_server = self._fork_servers.get(
+                Path(env["VIRTUAL_ENV"]) / "bin" / "python", cwd, env
+            )
+        return run_command_and_capture_experiment(
+            command=task.command.command,
+            env=env,
+            cwd=cwd,
+            prefix=self._output_prefix(task),
+            timeout=task.command.timeout,
+            log_path=log_path,
+            tail=tail,
+            echo=self.config.echo_output,
+            fork_server=fork_server,
+        )
+
     def _run_raw(
         self,
-        cmd: CommandConfig,
+        task: Task,
         cwd: Optional[str] = None,
         env: Optional[dict] = None,
     ) -> str:
-        sprint("  [cyan]Running raw command...[/cyan]")
-        rc = run_raw_command(command=cmd.command, env=env, cwd=cwd)
+        self._log(task, "[cyan]Running raw command...[/cyan]")
+        self._dashboard.task_status(task, "running")
+        tail: Deque[str] = deque(maxlen=self.config.log_tail_lines)
+        log_path = self.config.logs_dir / f"{task.hash}.log"
+        pool = self._local_pool
+        pids = []
+
+        def on_start(pid: int):
+            pids.append(pid)
+            if pool is not None:
+                pool.watch(pid, task.cores)
+
+        if pool is not None and task.cores:
+            self._log(task, f"[dim]Pinned to cores {','.join(map(str, task.cores))}[/dim]")
+        try:
+            rc = run_raw_command(
+                command=task.command.command,
+                env=env,
+                cwd=cwd,
+                prefix=self._output_prefix(task),
+                timeout=task.command.timeout,
+                log_path=log_path,
+                tail=tail,
+                echo=self.config.echo_output,
+                on_start=on_start,
+            )
+        finally:
+            peak = pool.unwatch(pids[0]) if pool is not None and pids else None
+        task.process = {"returncode": rc, "cores": task.cores}
+        if peak is not None:
+            task.process["peak_rss_mb"] = round(peak / 1024**2, 1)
+            self._log(task, f"[dim]Peak memory: {peak / 1024**2:.0f} MB[/dim]")
         if rc == 0:
-            sprint("  [green]Command completed successfully.[/green]")
+            self._log(task, "[green]Command completed successfully.[/green]")
             return "completed"
         else:
-            sprint(f"  [red]Command failed with exit code {rc}[/red]")
+            self._log(task, f"[red]Command failed with exit code {rc}[/red]", always=True)
+            self._print_tail(task, tail, log_path)
             return "failed"
 
-    def _check_existing_experiment(
-        self, workload: pb2.Workload, task_hash: str
-    ) -> Optional[str]:
-        """Check a previously-tracked experiment. Returns status to use, or None to re-run."""
-        exp_id = workload.experiment.id
-        url = self.beaker.workload.url(workload)
+    def _print_tail(self, task: Task, tail: Deque[str], log_path: Path):
+        """Show the buffered end of a failed command's output (unless it was already echoed)."""
+        if self.config.echo_output or not tail:
+            self._log(task, f"[dim]Full log: {log_path}[/dim]", always=True)
+            return
+        self._log(task, f"[dim]Last {len(tail)} lines of output (full log: {log_path}):[/dim]", always=True)
+        for line in tail:
+            sprint(f"    {self._output_prefix(task)}{line}", markup=False, highlight=False)
 
-        display_status = WORKLOAD_STATUS_DISPLAY.get(workload.status, "unknown")
+    def _check_existing_experiment(self, task: Task, entry: IndexEntry) -> Optional[str]:
+        """Check a previously-tracked experiment. Returns status to use, or None to re-run."""
+        exp_id = entry.experiment_id
+        url = f"{self.beaker.config.agent_address}/ex/{exp_id}"
 
-        if display_status == "completed":
-            sprint(f"  [green]Already completed on Beaker — skipping.[/green]")
-            sprint(f"  URL: [link={url}]{url}[/link]")
+        if entry.status == "completed":
+            task.experiment_id = exp_id
+            self._log(task, f"[green]Already completed on Beaker — skipping.[/green]")
+            self._log(task, f"URL: [link={url}]{url}[/link]")
             return "completed"
 
-        try:
-            status = get_experiment_status(self.beaker, exp_id)
-        except Exception as e:
-            sprint(f"  [dim]Could not check previous experiment: {e}[/dim]")
-            return None
+        created = datetime.fromtimestamp(entry.created, tz=timezone.utc)
+        if entry.status in ("failed", "canceled"):
+            # Finished workloads can't change, so the recorded status is final.
+            status = entry.status
+        else:
+            self._poller.watch(exp_id, created=created)
+            try:
+                status, _ = self._poller.wait(exp_id)
+            except Exception as e:
+                self._poller.unwatch(exp_id)
+                self._log(task, f"[dim]Could not check previous experiment: {e}[/dim]")
+                return None
 
         if status == "completed":
-            sprint(
-                "  [green]Previously launched experiment completed — skipping.[/green]"
+            self._log(
+                task, "[green]Previously launched experiment completed — skipping.[/green]"
             )
-            sprint(f"  URL: [link={url}]{url}[/link]")
+            self._log(task, f"URL: [link={url}]{url}[/link]")
+            self._poller.unwatch(exp_id)
             return "completed"
 
-        if status == "running":
-            sprint("  [yellow]Hooking to running experiment...[/yellow]")
-            sprint(f"  URL: [link={url}]{url}[/link]")
-            final = self._wait_for_experiment(exp_id, task_hash)
+        # An experiment this run launched before a restart is followed even while queued.
+        resumed = self._resumed.get(task.hash)
+        if status == "running" or (
+            status == "pending" and resumed is not None and resumed.experiment_id == exp_id
+        ):
+            self._log(task, f"[yellow]Hooking to {status} experiment...[/yellow]")
+            self._log(task, f"URL: [link={url}]{url}[/link]")
+            self._dashboard.task_status(task, status, url=url)
+            self._journal_record(
+                task.hash, "attached", experiment_id=exp_id, created=entry.created, status=status
+            )
+            final = self._wait_for_experiment(task, exp_id, created=created)
             return final
 
-        sprint(f"  [red]Previous run {status} — re-running.[/red]")
+        self._poller.unwatch(exp_id)
+        self._log(task, f"[red]Previous run {status} — re-running.[/red]")
         return None
 
     # ── Display helpers ────────────────────────────────────────────────
 
     def _print_task_table(self):
+        """Show the first TASK_TABLE_ROWS tasks and a per-status count of the rest."""
         table = Table(title="Tasks", box=None)
         table.add_column("#", style="cyan", width=4)
         table.add_column("Hash", style="yellow", width=14)
         table.add_column("Command", style="white", overflow="fold")
         table.add_column("Status", style="green", width=12)
 
-        for i, cmd in enumerate(self.config.commands):
-            task_hash = self.config.task_hash(cmd)
+        shown = set()
+        for i, cmd in enumerate(itertools.islice(self.config.iter_commands(), TASK_TABLE_ROWS)):
+            task_hash = self._task_hash(cmd)
+            shown.add(task_hash)
             cached = self._workload_cache.get(task_hash)
             if cached is not None:
-                status = WORKLOAD_STATUS_DISPLAY.get(cached.status, "unknown")
+                status = cached.status
             else:
                 status = "new"
             display_cmd = cmd.command if len(cmd.command) <= 80 else cmd.command[:77] + "..."
             table.add_row(str(i + 1), task_hash, display_cmd, status)
 
         sprint(table)
+        rest = self.config.command_count - TASK_TABLE_ROWS
+        if rest > 0:
+            # Everything not in the cache is new, so the cache alone gives the counts.
+            counts = Counter(
+                entry.status for h, entry in self._workload_cache.items() if h not in shown
+            )
+            counts["new"] = rest - sum(counts.values())
+            summary = ", ".join(f"{n} {status}" for status, n in sorted(counts.items()) if n > 0)
+            sprint(f"  [dim]... and {rest} more ({summary})[/dim]")
         sprint()
 
+    def _print_api_summary(self):
+        snap = self.metrics.snapshot()
+        if not snap["calls"]:
+            return
+        slowest = max(snap["methods"].items(), key=lambda kv: kv[1]["total_s"])
+        sprint(
+            f"  [dim]Beaker API: {snap['calls']} calls, {snap['errors']} errors, "
+            f"{snap['retries']} retries, {snap['throttled_s']:.1f}s rate-limited; "
+            f"most time in {slowest[0]} ({slowest[1]['count']} calls, "
+            f"{slowest[1]['total_s']:.1f}s, max {slowest[1]['max_s']:.2f}s)[/dim]"
+        )
+
+    def _metrics_stem(self) -> str:
+        return f"metrics-{self.config.run_stem}"
+
     def _write_artifact(self, filename: str, data: dict):
         if not self.config.state_dir:
             return
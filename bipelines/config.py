@@ -1,10 +1,16 @@
+import bisect
 import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import string
+from collections import Counter
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 from pathlib import Path
 
-import yaml
-
 
 @dataclass
 class RepoConfig:
@@ -28,6 +34,191 @@ class CommandConfig:
     command: str
     lib: Optional[str] = None
     raw: bool = False
+    name: Optional[str] = None
+    after: Optional[List[str]] = None
+    timeout: Optional[float] = None
+    # Where the launched experiment runs, for the `limits` on in-flight tasks.
+    cluster: Optional[str] = None
+    budget: Optional[str] = None
+    labels: Optional[List[str]] = None
+    # Re-run a task that ends in one of `retry_on` (default: failed) up to `retries`
+    # more times, waiting retry_backoff * 2**n seconds before retry n.
+    retries: int = 0
+    retry_on: Optional[List[str]] = None
+    retry_backoff: float = 60.0
+    # What a raw command needs from the parent node, when `local_pool` is on.
+    cpus: int = 1
+    memory_gb: Optional[float] = None
+
+
+@dataclass
+class SweepConfig:
+    """A command template expanded lazily into one command per parameter point.
+
+    `grid` axes are crossed with each other; `zip` axes (all the same length)
+    advance together and are crossed with the grid as a single axis. With
+    `samples`, that many distinct points are drawn at random (seeded by
+    `seed`) instead of taking every point. `command` and `name` are
+    `str.format` templates over the parameter names. Every point shares the
+    sweep's `after`.
+    """
+
+    command: str
+    grid: Dict[str, List[Any]] = field(default_factory=dict)
+    zip: Dict[str, List[Any]] = field(default_factory=dict)
+    samples: Optional[int] = None
+    seed: int = 0
+    name: Optional[str] = None
+    lib: Optional[str] = None
+    raw: bool = False
+    after: Optional[List[str]] = None
+    timeout: Optional[float] = None
+    cluster: Optional[str] = None
+    budget: Optional[str] = None
+    labels: Optional[List[str]] = None
+    retries: int = 0
+    retry_on: Optional[List[str]] = None
+    retry_backoff: float = 60.0
+    cpus: int = 1
+    memory_gb: Optional[float] = None
+
+    def _axes(self) -> List[Tuple[List[str], int]]:
+        """(parameter names, length) per axis, the zipped group last."""
+        axes = [([k], len(v)) for k, v in self.grid.items()]
+        if self.zip:
+            axes.append((list(self.zip), len(next(iter(self.zip.values())))))
+        return axes
+
+    @property
+    def size(self) -> int:
+        """Number of points in the full product (before sampling)."""
+        return math.prod(n for _, n in self._axes())
+
+    def __len__(self) -> int:
+        return self.size if self.samples is None else min(self.samples, self.size)
+
+    def point(self, index: int) -> Dict[str, Any]:
+        """The parameters of point `index` of the full product (last axis varies fastest)."""
+        axes = self._axes()
+        positions = [0] * len(axes)
+        for a in reversed(range(len(axes))):
+            index, positions[a] = divmod(index, axes[a][1])
+        params: Dict[str, Any] = {}
+        for (names, _), i in zip(axes, positions):
+            for name in names:
+                params[name] = (self.grid if name in self.grid else self.zip)[name][i]
+        return params
+
+    def _indices(self) -> Sequence[int]:
+        """Product indices of the points to run, in order."""
+        if self.samples is None:
+            return range(self.size)
+        # Sampling from a range picks indices without materialising the product.
+        rng = random.Random(self.seed)
+        return sorted(rng.sample(range(self.size), len(self)))
+
+    def points(self) -> Iterator[Dict[str, Any]]:
+        for index in self._indices():
+            yield self.point(index)
+
+    def expand(self) -> Iterator[CommandConfig]:
+        for params in self.points():
+            yield self._command(params)
+
+    def command_at(self, position: int) -> CommandConfig:
+        """The command at `position` in `expand()` order."""
+        return self._command(self.point(self._indices()[position]))
+
+    def positions(self, name: str, limit: int = 2) -> List[int]:
+        """Positions in `expand()` order of up to `limit` points called `name`.
+
+        Parses `name` against the name template instead of expanding the
+        sweep, so resolving an `after` reference costs the same for 10 points
+        as for 10,000.
+        """
+        if not self.name:
+            return []
+        axes = self._axes()
+        axis_of = {n: a for a, (names, _) in enumerate(axes) for n in names}
+        values = {**self.grid, **self.zip}
+        formatter = string.Formatter()
+        parts = list(formatter.parse(self.name))
+        matches: List[Tuple[Optional[int], ...]] = []
+
+        def match(at: int, part: int, chosen: List[Optional[int]]):
+            if part == len(parts):
+                if at == len(name):
+                    matches.append(tuple(chosen))
+                return
+            literal, field, spec, conversion = parts[part]
+            if not name.startswith(literal, at):
+                return
+            at += len(literal)
+            if field is None:
+                match(at, part + 1, chosen)
+                return
+            a = axis_of.get(field)
+            if a is None:
+                return
+            for i, value in enumerate(values[field]):
+                if chosen[a] is not None and chosen[a] != i:
+                    continue
+                text = formatter.format_field(formatter.convert_field(value, conversion), spec or "")
+                if name.startswith(text, at):
+                    previous, chosen[a] = chosen[a], i
+                    match(at + len(text), part + 1, chosen)
+                    chosen[a] = previous
+
+        match(0, 0, [None] * len(axes))
+
+        indices = self._indices()
+        found: List[int] = []
+        for chosen in dict.fromkeys(matches):
+            # Axes the template doesn't mention can take any value.
+            ranges = [range(n) if c is None else [c] for c, (_, n) in zip(chosen, axes)]
+            for combo in itertools.product(*ranges):
+                index = 0
+                for (_, n), i in zip(axes, combo):
+                    index = index * n + i
+                position = bisect.bisect_left(indices, index)
+                if position < len(indices) and indices[position] == index:
+                    found.append(position)
+                    if len(found) >= limit:
+                        return sorted(found)
+        return sorted(found)
+
+    def _command(self, params: Dict[str, Any]) -> CommandConfig:
+        return CommandConfig(
+            command=self.command.format(**params),
+            lib=self.lib,
+            raw=self.raw,
+            name=self.name.format(**params) if self.name else None,
+            after=self.after,
+            timeout=self.timeout,
+            cluster=self.cluster,
+            budget=self.budget,
+            labels=self.labels,
+            retries=self.retries,
+            retry_on=self.retry_on,
+            retry_backoff=self.retry_backoff,
+            cpus=self.cpus,
+            memory_gb=self.memory_gb,
+        )
+
+    def validate(self):
+        lengths = {len(v) for v in self.zip.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Sweep '{self.command}': zip axes must all have the same length")
+        overlap = set(self.grid) & set(self.zip)
+        if overlap:
+            raise ValueError(f"Sweep '{self.command}': {', '.join(sorted(overlap))} is both a grid and a zip axis")
+        if self.samples is not None and self.samples < 1:
+            raise ValueError(f"Sweep '{self.command}': samples must be at least 1")
+        if self.size:
+            try:
+                next(self.expand())
+            except (KeyError, IndexError) as e:
+                raise ValueError(f"Sweep '{self.command}': template refers to unknown parameter {e}")
 
 
 @dataclass
@@ -36,37 +227,352 @@ class BipelineConfig:
 
     commands: List[CommandConfig]
     repos: List[RepoConfig] = field(default_factory=list)
+    sweeps: List[SweepConfig] = field(default_factory=list)
 
     workspace: Optional[str] = None
     run_hash: str = ""
+    dedup_lookup: str = "auto"
+    dedup_key: str = "run"
+    dedup_env: List[str] = field(default_factory=list)
+    poll_interval: float = 15.0
+    api_rps: Optional[float] = 10.0
+    api_retries: int = 5
 
     local_env_dir: str = ".bipelines"
+    setup_workers: int = 4
     state_dir: Optional[str] = None
+    metrics_interval: Optional[float] = None
     dry_run: bool = False
+    echo_output: bool = False
+    log_tail_lines: int = 50
+    dashboard: str = "auto"
+    dashboard_refresh: float = 2.0
+    progress_interval: float = 60.0
+    max_parallel: int = 1
+    # What a failed or canceled task does to the rest of the run: abort stops launching
+    # new tasks; continue keeps going and only skips the failed task's dependents.
+    on_failure: str = "abort"
+    # Run raw commands in a pool sized by CPUs and memory (default: this node's),
+    # outside the max_parallel slots, optionally pinning each to its own cores.
+    local_pool: bool = False
+    local_cpus: Optional[int] = None
+    local_memory_gb: Optional[float] = None
+    pin_cpus: bool = False
+    # Caps on in-flight tasks, keyed by "cluster:<name>", "budget:<name>" or "label:<name>".
+    limits: Dict[str, int] = field(default_factory=dict)
+    shard_index: int = 0
+    shard_count: int = 1
+    # When the shards were launched (Unix time; set by bipelines-launch --shards). Other
+    # shards' experiments from before then are left over from earlier runs.
+    shards_started: Optional[float] = None
+    # Seconds to wait for another shard to launch a task before treating it as skipped.
+    shard_wait_timeout: Optional[float] = 6 * 3600.0
+    fork_server: bool = False
+    fork_server_preload: List[str] = field(default_factory=lambda: ["beaker", "gantry"])
 
     @property
     def repo_lookup(self) -> Dict[str, RepoConfig]:
         return {r.name: r for r in self.repos}
 
+    def iter_commands(self) -> Iterator[CommandConfig]:
+        """Every command to run: the listed ones, then each sweep's points, expanded lazily."""
+        yield from self.commands
+        for sweep in self.sweeps:
+            yield from sweep.expand()
+
+    @property
+    def command_count(self) -> int:
+        return len(self.commands) + sum(len(s) for s in self.sweeps)
+
     def validate(self):
-        """Check that all lib references in commands point to known repos."""
+        """Check lib references, sweeps, command names and the `after` dependency graph."""
+        for sweep in self.sweeps:
+            sweep.validate()
+
         repo_names = {r.name for r in self.repos}
-        for cmd in self.commands:
-            if cmd.lib and cmd.lib not in repo_names:
+        for lib in [c.lib for c in self.commands] + [s.lib for s in self.sweeps]:
+            if lib and lib not in repo_names:
                 raise ValueError(
-                    f"Command references unknown lib '{cmd.lib}'. "
+                    f"Command references unknown lib '{lib}'. "
                     f"Available repos: {', '.join(sorted(repo_names))}"
                 )
 
+        if self.dedup_lookup not in ("auto", "scan", "targeted"):
+            raise ValueError(
+                f"dedup_lookup must be one of auto, scan, targeted; got '{self.dedup_lookup}'"
+            )
+
+        if self.dedup_key not in ("run", "content"):
+            raise ValueError(f"dedup_key must be one of run, content; got '{self.dedup_key}'")
+
+        if self.api_rps is not None and self.api_rps <= 0:
+            raise ValueError(f"api_rps must be positive (or null for no limit), got {self.api_rps}")
+        if self.api_retries < 1:
+            raise ValueError(f"api_retries must be at least 1, got {self.api_retries}")
+
+        if self.metrics_interval is not None and self.metrics_interval <= 0:
+            raise ValueError(f"metrics_interval must be positive, got {self.metrics_interval}")
+
+        if self.max_parallel < 1:
+            raise ValueError(f"max_parallel must be at least 1, got {self.max_parallel}")
+
+        if self.local_cpus is not None and self.local_cpus < 1:
+            raise ValueError(f"local_cpus must be at least 1, got {self.local_cpus}")
+        if self.local_memory_gb is not None and self.local_memory_gb <= 0:
+            raise ValueError(f"local_memory_gb must be positive, got {self.local_memory_gb}")
+
+        if self.on_failure not in ("abort", "continue"):
+            raise ValueError(f"on_failure must be one of abort, continue; got '{self.on_failure}'")
+        for cmd in [*self.commands, *self.sweeps]:
+            if cmd.retries < 0 or cmd.retry_backoff < 0:
+                raise ValueError(
+                    f"Command '{cmd.name or cmd.command}': retries and retry_backoff must not be negative"
+                )
+            if cmd.cpus < 1 or (cmd.memory_gb is not None and cmd.memory_gb < 0):
+                raise ValueError(
+                    f"Command '{cmd.name or cmd.command}': cpus must be at least 1 and memory_gb not negative"
+                )
+            for status in cmd.retry_on or []:
+                if status not in ("failed", "canceled"):
+                    raise ValueError(
+                        f"Command '{cmd.name or cmd.command}': retry_on must list failed and/or "
+                        f"canceled, got '{status}'"
+                    )
+
+        for key, limit in self.limits.items():
+            kind, _, name = key.partition(":")
+            if kind not in ("cluster", "budget", "label") or not name:
+                raise ValueError(
+                    f"Limit key '{key}' must look like cluster:<name>, budget:<name> or label:<name>"
+                )
+            if not isinstance(limit, int) or limit < 1:
+                raise ValueError(f"Limit for '{key}' must be a positive integer, got {limit!r}")
+            if limit < self.shard_count:
+                raise ValueError(
+                    f"Limit for '{key}' ({limit}) can't be split across {self.shard_count} shards"
+                )
+
+        if self.shard_count < 1 or not 0 <= self.shard_index < self.shard_count:
+            raise ValueError(
+                f"shard_index must be in [0, shard_count); got {self.shard_index} of {self.shard_count}"
+            )
+        if self.shard_count > 1 and not self.workspace:
+            raise ValueError("Sharded runs need a workspace: shards find each other's experiments there")
+        if self.shard_count > 1 and self.dedup_key == "content":
+            # Each shard would resolve the branch on its own, and could disagree on who owns a task.
+            unpinned = [r.name for r in self.repos if not r.commit]
+            if unpinned:
+                raise ValueError(
+                    f"Sharded runs with dedup_key: content need a pinned commit for every repo "
+                    f"(missing: {', '.join(unpinned)}); bipelines-launch --shards pins branch heads itself"
+                )
+        if self.shard_wait_timeout is not None and self.shard_wait_timeout <= 0:
+            raise ValueError(
+                f"shard_wait_timeout must be positive (or null to wait forever), got {self.shard_wait_timeout}"
+            )
+
+        if self.dashboard not in ("auto", "live", "plain", "off"):
+            raise ValueError(f"dashboard must be one of auto, live, plain, off; got '{self.dashboard}'")
+        if self.dashboard_refresh <= 0 or self.progress_interval <= 0:
+            raise ValueError("dashboard_refresh and progress_interval must be positive")
+
+        # Names are checked against sweep templates rather than expanded sweeps.
+        counts = Counter(c.name for c in self.commands if c.name)
+        duplicates = {n for n, count in counts.items() if count > 1}
+        duplicates |= {n for n in counts if any(s.positions(n, limit=1) for s in self.sweeps)}
+        if duplicates:
+            raise ValueError(f"Duplicate command names: {', '.join(sorted(duplicates))}")
+
+        # The graph has one node per listed command and one per sweep. Every point
+        # of a sweep shares its `after`, so a cycle between tasks is a cycle here.
+        groups = [*self.commands, *self.sweeps]
+        offsets = self._sweep_offsets()
+
+        def group_of(index: int) -> int:
+            if index < len(self.commands):
+                return index
+            return len(self.commands) + bisect.bisect_right(offsets, index) - 1
+
+        deps: List[set] = []
+        for g, cmd in enumerate(groups):
+            label = cmd.name or cmd.command
+            d = set()
+            for dep in cmd.after or []:
+                found = self.find(dep)
+                if not found:
+                    raise ValueError(f"Command '{label}' depends on unknown command '{dep}'")
+                if len(found) > 1:
+                    raise ValueError(f"Duplicate command names: {dep}")
+                if group_of(found[0]) == g:
+                    if g < len(self.commands):
+                        raise ValueError(f"Command '{label}' depends on itself")
+                    raise ValueError(f"Sweep '{label}' depends on one of its own points ('{dep}')")
+                d.add(group_of(found[0]))
+            deps.append(d)
+
+        # Kahn's algorithm: anything left unvisited sits on a cycle.
+        indegree = [len(d) for d in deps]
+        dependents: List[List[int]] = [[] for _ in groups]
+        for i, d in enumerate(deps):
+            for j in d:
+                dependents[j].append(i)
+        ready = [i for i, n in enumerate(indegree) if n == 0]
+        visited = 0
+        while ready:
+            i = ready.pop()
+            visited += 1
+            for j in dependents[i]:
+                indegree[j] -= 1
+                if indegree[j] == 0:
+                    ready.append(j)
+        if visited != len(groups):
+            cyclic = [groups[i].name or groups[i].command for i, n in enumerate(indegree) if n > 0]
+            raise ValueError(f"Dependency cycle between commands: {', '.join(cyclic)}")
+
+    def _sweep_offsets(self) -> List[int]:
+        """Index of each sweep's first point in `iter_commands()` order."""
+        offsets = []
+        start = len(self.commands)
+        for sweep in self.sweeps:
+            offsets.append(start)
+            start += len(sweep)
+        return offsets
+
+    def command_at(self, index: int) -> CommandConfig:
+        """The command at `index` in `iter_commands()` order, expanding only that point."""
+        if index < len(self.commands):
+            return self.commands[index]
+        for sweep, offset in zip(self.sweeps, self._sweep_offsets()):
+            if index < offset + len(sweep):
+                return sweep.command_at(index - offset)
+        raise IndexError(f"No command at index {index}")
+
+    def find(self, name: str, limit: int = 2) -> List[int]:
+        """Indices of up to `limit` commands called `name`, without expanding sweeps."""
+        found = [i for i, c in enumerate(self.commands) if c.name == name][:limit]
+        for sweep, offset in zip(self.sweeps, self._sweep_offsets()):
+            if len(found) >= limit:
+                break
+            found += [offset + p for p in sweep.positions(name, limit - len(found))]
+        return found
+
+    def dependency_resolver(self) -> Callable[[CommandConfig], List[int]]:
+        """A function resolving a command's `after` names to the indices it waits on.
+
+        Each name is looked up once (see `find`), so resolving every point of
+        a large sweep costs no more than resolving the sweep's own `after`.
+        """
+        resolved: Dict[str, Optional[int]] = {}
+
+        def dependencies(cmd: CommandConfig) -> List[int]:
+            deps = []
+            for name in cmd.after or []:
+                if name not in resolved:
+                    found = self.find(name, limit=1)
+                    resolved[name] = found[0] if found else None
+                if resolved[name] is not None:
+                    deps.append(resolved[name])
+            return deps
+
+        return dependencies
+
     def repo_dir(self, repo_name: str) -> Path:
         """Resolve the on-disk path for a cloned repo."""
         return Path(self.local_env_dir).resolve() / "repos" / repo_name
 
-    def task_hash(self, cmd: CommandConfig) -> str:
-        """Deterministic hash for deduplication: command + run_hash."""
-        content = f"{cmd.command}|{self.run_hash}"
+    @property
+    def logs_dir(self) -> Path:
+        """Where per-task command output is written: state_dir/logs, else local_env_dir/logs."""
+        return Path(self.state_dir or self.local_env_dir).resolve() / "logs"
+
+    @property
+    def index_path(self) -> Path:
+        """Location of the on-disk dedup index: state_dir if set, else local_env_dir."""
+        return Path(self.state_dir or self.local_env_dir).resolve() / "dedup-index.sqlite"
+
+    @property
+    def journal_path(self) -> Optional[Path]:
+        """Append-only run journal in state_dir (None without a state_dir)."""
+        if not self.state_dir:
+            return None
+        return Path(self.state_dir).resolve() / f"journal-{self.run_stem}.jsonl"
+
+    def resolved_commits(self) -> Dict[str, str]:
+        """The checked-out commit of each repo that has been cloned locally, by repo name."""
+        import subprocess
+
+        commits = {}
+        for repo in self.repos:
+            path = self.repo_dir(repo.name)
+            if not (path / ".git").exists():
+                continue
+            result = subprocess.run(
+                ["git", "rev-parse", "HEAD"], cwd=path, capture_output=True, text=True
+            )
+            if result.returncode == 0:
+                commits[repo.name] = result.stdout.strip()
+        return commits
+
+    @property
+    def run_stem(self) -> str:
+        """Run hash plus shard, naming this parent's journal, artifact and metrics files."""
+        stem = self.run_hash or "default"
+        if self.shard_count > 1:
+            stem += f"-shard{self.shard_index}of{self.shard_count}"
+        return stem
+
+    @property
+    def shard_limits(self) -> Dict[str, int]:
+        """This parent's share of `limits`: each cap is split across the shards, summing to the cap."""
+        return {
+            key: limit // self.shard_count + (self.shard_index < limit % self.shard_count)
+            for key, limit in self.limits.items()
+        }
+
+    def owns(self, task_hash: str) -> bool:
+        """Whether this shard launches `task_hash` (every hash belongs to exactly one shard)."""
+        return int(task_hash, 16) % self.shard_count == self.shard_index
+
+    def task_hash(self, cmd: CommandConfig, commits: Optional[Dict[str, str]] = None) -> str:
+        """Deterministic hash for deduplication.
+
+        With `dedup_key: run` (the default) this is command + run_hash. With
+        `dedup_key: content` it covers what the task actually computes instead:
+        the command, its lib's resolved commit (from `commits`) and install
+        command, and the values of the `dedup_env` variables. run_hash is left
+        out, so identical work is reused across batches.
+        """
+        if self.dedup_key != "content":
+            content = f"{cmd.command}|{self.run_hash}"
+            return hashlib.sha256(content.encode()).hexdigest()[:12]
+
+        repo = self.repo_lookup.get(cmd.lib) if cmd.lib else None
+        commit = None
+        if repo is not None:
+            # Before the repo is cloned, fall back to what the config pins (see hash_is_provisional).
+            commit = (commits or {}).get(repo.name) or repo.commit or f"branch:{repo.branch}"
+        key = {
+            "command": cmd.command,
+            "lib": cmd.lib,
+            "commit": commit,
+            "install": repo.install if repo is not None else None,
+            "env": {name: os.environ.get(name) for name in sorted(self.dedup_env)},
+        }
+        content = "content|" + json.dumps(key, sort_keys=True)
         return hashlib.sha256(content.encode()).hexdigest()[:12]
 
+    def hash_is_provisional(self, cmd: CommandConfig, commits: Optional[Dict[str, str]] = None) -> bool:
+        """Whether `task_hash` keyed `cmd` on a branch name rather than a commit.
+
+        Happens with content keys for a lib repo that has no pinned `commit`
+        and isn't cloned yet; the real run hashes the commit the branch
+        resolves to, so the hash will differ.
+        """
+        if self.dedup_key != "content" or not cmd.lib:
+            return False
+        repo = self.repo_lookup.get(cmd.lib)
+        return repo is not None and not repo.commit and repo.name not in (commits or {})
+
     def to_dict(self) -> dict:
         """Serialize to a plain dict suitable for YAML output."""
         d: dict = {}
@@ -74,12 +580,63 @@ class BipelineConfig:
             d["run_hash"] = self.run_hash
         if self.workspace:
             d["workspace"] = self.workspace
+        if self.dedup_lookup != "auto":
+            d["dedup_lookup"] = self.dedup_lookup
+        if self.dedup_key != "run":
+            d["dedup_key"] = self.dedup_key
+        if self.dedup_env:
+            d["dedup_env"] = self.dedup_env
+        if self.poll_interval != 15.0:
+            d["poll_interval"] = self.poll_interval
+        if self.api_rps != 10.0:
+            d["api_rps"] = self.api_rps
+        if self.api_retries != 5:
+            d["api_retries"] = self.api_retries
         if self.local_env_dir != ".bipelines":
             d["local_env_dir"] = self.local_env_dir
+        if self.setup_workers != 4:
+            d["setup_workers"] = self.setup_workers
         if self.state_dir:
             d["state_dir"] = self.state_dir
+        if self.metrics_interval is not None:
+            d["metrics_interval"] = self.metrics_interval
         if self.dry_run:
             d["dry_run"] = self.dry_run
+        if self.echo_output:
+            d["echo_output"] = self.echo_output
+        if self.log_tail_lines != 50:
+            d["log_tail_lines"] = self.log_tail_lines
+        if self.dashboard != "auto":
+            d["dashboard"] = self.dashboard
+        if self.dashboard_refresh != 2.0:
+            d["dashboard_refresh"] = self.dashboard_refresh
+        if self.progress_interval != 60.0:
+            d["progress_interval"] = self.progress_interval
+        if self.max_parallel != 1:
+            d["max_parallel"] = self.max_parallel
+        if self.on_failure != "abort":
+            d["on_failure"] = self.on_failure
+        if self.local_pool:
+            d["local_pool"] = self.local_pool
+        if self.local_cpus is not None:
+            d["local_cpus"] = self.local_cpus
+        if self.local_memory_gb is not None:
+            d["local_memory_gb"] = self.local_memory_gb
+        if self.pin_cpus:
+            d["pin_cpus"] = self.pin_cpus
+        if self.limits:
+            d["limits"] = self.limits
+        if self.shard_count != 1:
+            d["shard_index"] = self.shard_index
+            d["shard_count"] = self.shard_count
+        if self.shards_started is not None:
+            d["shards_started"] = self.shards_started
+        if self.shard_wait_timeout != 6 * 3600.0:
+            d["shard_wait_timeout"] = self.shard_wait_timeout
+        if self.fork_server:
+            d["fork_server"] = self.fork_server
+        if self.fork_server_preload != ["beaker", "gantry"]:
+            d["fork_server_preload"] = self.fork_server_preload
         if self.repos:
             d["repos"] = [
                 {k: v for k, v in r.__dict__.items() if v is not None and k != "name"}
@@ -89,24 +646,54 @@ class BipelineConfig:
             {k: v for k, v in c.__dict__.items() if v is not None}
             for c in self.commands
         ]
+        if self.sweeps:
+            d["sweeps"] = [
+                {k: v for k, v in s.__dict__.items() if v is not None and v != {}}
+                for s in self.sweeps
+            ]
         return d
 
     def to_yaml(self, path: str) -> str:
         """Write this config to a YAML file and return the path."""
+        import yaml
+
         with open(path, "w") as f:
             yaml.dump(self.to_dict(), f, default_flow_style=False, sort_keys=False)
         return path
 
 
 def load_config_from_dict(data: dict) -> BipelineConfig:
-    kwargs = {k: v for k, v in data.items() if k not in ("repos", "commands")}
+    kwargs = {k: v for k, v in data.items() if k not in ("repos", "commands", "sweep", "sweeps")}
     kwargs["repos"] = [RepoConfig(**r) for r in data.get("repos", [])]
 
+    sweeps = data.get("sweeps", [])
+    if "sweep" in data:
+        sweeps = [data["sweep"], *sweeps]
+    kwargs["sweeps"] = []
+    for s in sweeps:
+        s = dict(s)
+        if "depends_on" in s:
+            s["after"] = s.pop("depends_on")
+        if isinstance(s.get("after"), str):
+            s["after"] = [s["after"]]
+        for key in ("labels", "retry_on"):
+            if isinstance(s.get(key), str):
+                s[key] = [s[key]]
+        kwargs["sweeps"].append(SweepConfig(**s))
+
     commands = []
     for c in data.get("commands", []):
         if isinstance(c, str):
             commands.append(CommandConfig(command=c))
         elif isinstance(c, dict):
+            c = dict(c)
+            if "depends_on" in c:
+                c["after"] = c.pop("depends_on")
+            if isinstance(c.get("after"), str):
+                c["after"] = [c["after"]]
+            for key in ("labels", "retry_on"):
+                if isinstance(c.get(key), str):
+                    c[key] = [c[key]]
             commands.append(CommandConfig(**c))
         else:
             raise ValueError(f"Invalid command entry: {c!r}")
@@ -118,6 +705,8 @@ def load_config_from_dict(data: dict) -> BipelineConfig:
 
 
 def load_config_from_yaml(path: str) -> BipelineConfig:
+    import yaml
+
     with open(path) as f:
         data = yaml.safe_load(f)
     return load_config_from_dict(data)
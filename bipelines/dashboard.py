@@ -0,0 +1,214 @@
+"""Run progress display: a live terminal dashboard, or periodic summary lines for plain logs.
+
+Only aggregate counts, the oldest in-flight tasks and the latest failures are
+rendered, so a refresh costs the same for 10 tasks as for 10,000.
+"""
+
+import itertools
+import threading
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, Iterable, Optional, Tuple
+
+from rich.console import Console, Group
+from rich.live import Live
+from rich.progress_bar import ProgressBar
+from rich.table import Table
+from rich.text import Text
+
+from bipelines.scheduler import Task
+from bipelines.status import FAILED_STATUSES
+
+# In-flight tasks listed at once; the rest are summarised as "+N more".
+ACTIVE_ROWS = 12
+# Most recent failures kept on screen.
+FAILED_ROWS = 5
+
+_STATUS_STYLES = {
+    "completed": "green",
+    "failed": "red",
+    "canceled": "red",
+    "skipped": "dim",
+    "dry_run": "dim",
+    "running": "cyan",
+    "pending": "yellow",
+}
+
+
+class _Active:
+    __slots__ = ("label", "status", "url", "since")
+
+    def __init__(self, label: str, status: str):
+        self.label = label
+        self.status = status
+        self.url: Optional[str] = None
+        self.since = time.monotonic()
+
+
+def _duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class Dashboard:
+    """Thread-safe progress tracker for a run of `total` tasks.
+
+    `mode` is `live` (a rich.Live panel redrawn `refresh` times per second),
+    `plain` (a one-line summary every `interval` seconds, for non-TTY logs
+    such as a Beaker parent job's), `off`, or `auto` (live on a terminal,
+    plain otherwise). Task updates only touch counters; drawing happens on
+    the display's own schedule.
+    """
+
+    def __init__(
+        self,
+        console: Console,
+        total: int,
+        mode: str = "auto",
+        refresh: float = 2.0,
+        interval: float = 60.0,
+    ):
+        if mode == "auto":
+            mode = "live" if console.is_terminal else "plain"
+        self.console = console
+        self.total = total
+        self.mode = mode
+        self.refresh = refresh
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active: Dict[int, _Active] = {}
+        self._finished: Counter = Counter()
+        self._failed: Deque[Tuple[str, str]] = deque(maxlen=FAILED_ROWS)
+        self._started = time.monotonic()
+        self._live: Optional[Live] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ── Updates (called from task threads) ─────────────────────────────
+
+    def task_started(self, task: Task):
+        with self._lock:
+            self._active[task.index] = _Active(task.label, "starting")
+
+    def task_status(self, task: Task, status: str, url: Optional[str] = None):
+        with self._lock:
+            row = self._active.get(task.index)
+            if row is not None:
+                row.status = status
+                if url is not None:
+                    row.url = url
+
+    def task_finished(self, task: Task, status: str):
+        with self._lock:
+            self._active.pop(task.index, None)
+            self._finished[status] += 1
+            if status in FAILED_STATUSES:
+                self._failed.append((task.label, status))
+
+    def settle(self, tasks: Iterable[Task]):
+        """Count tasks that ended without `task_finished`: skipped before they started,
+        or waiting on a retry when the run aborted."""
+        for task in tasks:
+            with self._lock:
+                active = task.index in self._active
+            if active or (task.status == "skipped" and not task.attempts):
+                self.task_finished(task, task.status)
+
+    # ── Display ────────────────────────────────────────────────────────
+
+    def start(self):
+        self._started = time.monotonic()
+        if self.mode == "live":
+            self._live = Live(
+                console=self.console,
+                get_renderable=self._render,
+                refresh_per_second=self.refresh,
+                transient=True,
+            )
+            self._live.start()
+        elif self.mode == "plain":
+            self._thread = threading.Thread(target=self._plain_loop, name="bipelines-progress", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._live is not None:
+            self._live.stop()
+            self._live = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.mode != "off":
+            self.console.print(self.summary(), markup=False, highlight=False)
+
+    def __enter__(self) -> "Dashboard":
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _plain_loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.console.print(self.summary(), markup=False, highlight=False)
+            except Exception:
+                pass
+
+    def _counts(self) -> Tuple[int, Counter, Counter]:
+        with self._lock:
+            finished = Counter(self._finished)
+            active = Counter(row.status for row in self._active.values())
+        return sum(finished.values()), finished, active
+
+    def summary(self) -> str:
+        """One line: progress, finished statuses, in-flight statuses and elapsed time."""
+        done, finished, active = self._counts()
+        waiting = max(0, self.total - done - sum(active.values()))
+        parts = [f"{status} {n}" for status, n in sorted(finished.items())]
+        parts += [f"{status} {n}" for status, n in sorted(active.items())]
+        if waiting:
+            parts.append(f"waiting {waiting}")
+        elapsed = _duration(time.monotonic() - self._started)
+        return f"[progress] {done}/{self.total} done ({', '.join(parts) or 'nothing started'}) in {elapsed}"
+
+    def _render(self):
+        done, finished, active = self._counts()
+        now = time.monotonic()
+        with self._lock:
+            n_active = len(self._active)
+            rows = [
+                (r.label, r.status, _duration(now - r.since), r.url or "")
+                for r in itertools.islice(self._active.values(), ACTIVE_ROWS)
+            ]
+            failed = list(self._failed)
+
+        header = Text()
+        header.append(f"{done}/{self.total} done", style="bold")
+        for status, n in sorted(finished.items()):
+            header.append(f"  {status} {n}", style=_STATUS_STYLES.get(status, ""))
+        for status, n in sorted(active.items()):
+            header.append(f"  {status} {n}", style=_STATUS_STYLES.get(status, ""))
+        header.append(f"  elapsed {_duration(now - self._started)}", style="dim")
+        parts = [header, ProgressBar(total=max(self.total, 1), completed=done)]
+
+        if rows:
+            table = Table(box=None, show_header=True, header_style="dim", pad_edge=False)
+            table.add_column("Task", style="cyan", no_wrap=True, max_width=40)
+            table.add_column("Status", width=10)
+            table.add_column("Time", justify="right", width=8)
+            table.add_column("URL", overflow="ellipsis", no_wrap=True)
+            for label, status, elapsed, url in rows:
+                table.add_row(label, Text(status, style=_STATUS_STYLES.get(status, "")), elapsed, url)
+            parts.append(table)
+            if n_active > len(rows):
+                parts.append(Text(f"+{n_active - len(rows)} more in flight", style="dim"))
+
+        if failed:
+            parts.append(
+                Text("Recent failures: ", style="red").append(
+                    ", ".join(f"{label} ({status})" for label, status in failed), style=""
+                )
+            )
+        return Group(*parts)
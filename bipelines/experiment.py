@@ -1,12 +1,17 @@
 import os
 import re
-import subprocess
 import time
-from typing import Optional, Tuple
+from pathlib import Path
+from typing import Callable, Deque, Optional, Tuple
 
 from beaker import Beaker, BeakerWorkloadStatus
+from beaker import beaker_pb2 as pb2
 from rich.console import Console
 
+from bipelines.forkserver import ForkServer, ForkServerError, python_argv
+from bipelines.runner import get_runner
+from bipelines.status import TERMINAL_STATUSES
+
 console = Console()
 
 
@@ -18,6 +23,20 @@ def sprint(*args, **kwargs):
         print(plain)
 
 
+WORKLOAD_STATUS_DISPLAY = {
+    pb2.WorkloadStatus.STATUS_SUBMITTED: "pending",
+    pb2.WorkloadStatus.STATUS_QUEUED: "pending",
+    pb2.WorkloadStatus.STATUS_INITIALIZING: "pending",
+    pb2.WorkloadStatus.STATUS_READY_TO_START: "pending",
+    pb2.WorkloadStatus.STATUS_RUNNING: "running",
+    pb2.WorkloadStatus.STATUS_STOPPING: "running",
+    pb2.WorkloadStatus.STATUS_UPLOADING_RESULTS: "running",
+    pb2.WorkloadStatus.STATUS_SUCCEEDED: "completed",
+    pb2.WorkloadStatus.STATUS_FAILED: "failed",
+    pb2.WorkloadStatus.STATUS_CANCELED: "canceled",
+}
+
+
 EXPERIMENT_RE = re.compile(r"Experiment:\s+(\S+)\s+→\s+(https://beaker\.org/ex/(\S+))")
 EXPERIMENT_SUBMITTED_RE = re.compile(r"Experiment submitted, see progress at\s+(https://beaker\.org/ex/(\S+))")
 
@@ -38,42 +57,75 @@ def parse_experiment_line(line: str) -> Optional[Tuple[str, str, str]]:
     return None
 
 
+def _launch_env(env: Optional[dict]) -> dict:
+    merged_env = {**os.environ, **(env or {})}
+    merged_env.setdefault("COLUMNS", "500")
+    return merged_env
+
+
 def run_command_and_capture_experiment(
     command: str,
     env: Optional[dict] = None,
     cwd: Optional[str] = None,
+    prefix: str = "",
+    timeout: Optional[float] = None,
+    log_path: Optional[Path] = None,
+    tail: Optional[Deque[str]] = None,
+    echo: bool = True,
+    fork_server: Optional[ForkServer] = None,
 ) -> Tuple[str, str, str]:
-    """Run a command locally, streaming output and capturing the experiment line.
+    """Run a command locally, capturing the experiment line from its output.
+
+    The command runs on the shared asyncio runner, so many launchers can be in
+    flight at once. Output goes to `log_path` and the `tail` buffer when given,
+    and is echoed with `prefix` when `echo` is set. Given a `fork_server`,
+    plain `python ...` commands run in a child forked from it instead.
 
     Returns (experiment_name, url, experiment_id).
-    Raises RuntimeError if the command fails or no experiment line is found.
+    Raises RuntimeError if the command fails, times out, or no experiment line is found.
     """
-    merged_env = {**os.environ, **(env or {})}
-    merged_env.setdefault("COLUMNS", "500")
-
-    proc = subprocess.Popen(
-        command,
-        shell=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        env=merged_env,
-        cwd=cwd,
-    )
-
     experiment_info = None
-    for line in proc.stdout:
-        stripped = line.rstrip("\n")
-        print(f"  {stripped}")
-        if experiment_info is None:
-            parsed = parse_experiment_line(stripped)
-            if parsed:
-                experiment_info = parsed
 
-    proc.wait()
-
-    if proc.returncode != 0:
-        raise RuntimeError(f"Command exited with code {proc.returncode}")
+    def on_line(line: str):
+        nonlocal experiment_info
+        if experiment_info is None:
+            experiment_info = parse_experiment_line(line)
+
+    result = None
+    argv = python_argv(command) if fork_server is not None and log_path is not None else None
+    if argv is not None:
+        try:
+            result = fork_server.run(
+                argv,
+                env=_launch_env(env),
+                log_path=log_path,
+                cwd=cwd,
+                prefix=prefix,
+                timeout=timeout,
+                on_line=on_line,
+                tail=tail,
+                echo=echo,
+            )
+        except ForkServerError as e:
+            sprint(f"  [dim]Warning: {e}; launching normally[/dim]")
+    if result is None:
+        result = get_runner().run(
+            command,
+            env=_launch_env(env),
+            cwd=cwd,
+            prefix=prefix,
+            timeout=timeout,
+            on_line=on_line,
+            log_path=log_path,
+            tail=tail,
+            echo=echo,
+        )
+
+    if result.timed_out:
+        raise RuntimeError(f"Command timed out after {timeout:g}s")
+
+    if result.returncode != 0:
+        raise RuntimeError(f"Command exited with code {result.returncode}")
 
     if experiment_info is None:
         raise RuntimeError("No 'Experiment: ... → ...' line found in command output")
@@ -85,35 +137,44 @@ def run_raw_command(
     command: str,
     env: Optional[dict] = None,
     cwd: Optional[str] = None,
+    prefix: str = "",
+    timeout: Optional[float] = None,
+    log_path: Optional[Path] = None,
+    tail: Optional[Deque[str]] = None,
+    echo: bool = True,
+    on_start: Optional[Callable[[int], None]] = None,
 ) -> int:
-    """Run a command locally, streaming output. Returns the exit code."""
-    merged_env = {**os.environ, **(env or {})}
-    merged_env.setdefault("COLUMNS", "500")
+    """Run a command locally, streaming output. Returns the exit code (-9 on timeout).
 
-    proc = subprocess.Popen(
+    `on_start` is called with the process's pid (and process group id) once it starts.
+    """
+    result = get_runner().run(
         command,
-        shell=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        env=merged_env,
+        env=_launch_env(env),
         cwd=cwd,
+        prefix=prefix,
+        timeout=timeout,
+        log_path=log_path,
+        tail=tail,
+        echo=echo,
+        on_start=on_start,
     )
-
-    for line in proc.stdout:
-        print(f"  {line.rstrip(chr(10))}")
-
-    proc.wait()
-    return proc.returncode
+    return result.returncode
 
 
 def get_experiment_status(beaker: Beaker, experiment_id: str) -> str:
     """Get the current status of a Beaker experiment by ID."""
+    return get_experiment_state(beaker, experiment_id)[0]
+
+
+def get_experiment_state(beaker: Beaker, experiment_id: str) -> Tuple[str, str]:
+    """Get the current (status, description) of a Beaker experiment by ID."""
     workload = beaker.workload.get(experiment_id)
+    description = workload.experiment.description or ""
     job = beaker.workload.get_latest_job(workload)
 
     if job is None:
-        return "pending"
+        return "pending", description
 
     STATUS_MAP = {
         BeakerWorkloadStatus.running: "running",
@@ -121,7 +182,7 @@ def get_experiment_status(beaker: Beaker, experiment_id: str) -> str:
         BeakerWorkloadStatus.failed: "failed",
         BeakerWorkloadStatus.canceled: "canceled",
     }
-    return STATUS_MAP.get(job.status.status, "unknown")
+    return STATUS_MAP.get(job.status.status, "unknown"), description
 
 
 def wait_for_experiment(
@@ -0,0 +1,281 @@
+"""In-process stand-in for the parts of the Beaker client bipelines uses.
+
+Implements `Beaker.workload.{list,get,get_latest_job,update,url}`,
+`Beaker.workspace.get` and `Beaker.config.agent_address` over an in-memory workspace, with per-RPC
+latency, scripted experiment lifecycles and a configurable number of
+pre-existing workloads. Everything runs on a `SimClock`, so a 10-minute
+experiment can finish in well under a second of wall time. Used by
+`python -m bipelines.bench`.
+"""
+
+import bisect
+import itertools
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional
+
+from beaker import BeakerSortOrder
+from beaker import beaker_pb2 as pb2
+from beaker.exceptions import BeakerWorkloadNotFound
+from google.protobuf.timestamp_pb2 import Timestamp
+
+
+class SimClock:
+    """A wall clock that runs `scale` times faster than real time."""
+
+    def __init__(self, scale: float = 1.0, start: Optional[datetime] = None):
+        self.scale = scale
+        self._start = start or datetime.now(timezone.utc)
+        self._real_start = time.monotonic()
+
+    def now(self) -> datetime:
+        return self._start + timedelta(seconds=(time.monotonic() - self._real_start) * self.scale)
+
+    def real_seconds(self, sim_seconds: float) -> float:
+        """How long `sim_seconds` of simulated time takes in real time."""
+        return sim_seconds / self.scale
+
+    def sleep(self, sim_seconds: float):
+        if sim_seconds > 0:
+            time.sleep(self.real_seconds(sim_seconds))
+
+
+@dataclass
+class _Record:
+    id: str
+    name: str
+    description: str
+    created: datetime
+    queue_time: float
+    run_time: float
+    outcome: int
+
+    def status(self, now: datetime) -> int:
+        age = (now - self.created).total_seconds()
+        if age < self.queue_time:
+            return pb2.WorkloadStatus.STATUS_QUEUED
+        if age < self.queue_time + self.run_time:
+            return pb2.WorkloadStatus.STATUS_RUNNING
+        return self.outcome
+
+
+class FakeWorkloadClient:
+    MAX_PAGE_SIZE = 50
+
+    def __init__(self, beaker: "FakeBeaker"):
+        self._beaker = beaker
+
+    def _to_pb2(self, r: _Record, now: datetime) -> pb2.Workload:
+        created = Timestamp()
+        created.FromDatetime(r.created)
+        return pb2.Workload(
+            experiment=pb2.Experiment(
+                id=r.id,
+                name=r.name,
+                description=r.description,
+                created=created,
+                tasks=[pb2.Task(id=f"{r.id}-task")],
+            ),
+            status=r.status(now),
+        )
+
+    def list(
+        self,
+        *,
+        workspace=None,
+        created_before: Optional[datetime] = None,
+        created_after: Optional[datetime] = None,
+        finalized: Optional[bool] = None,
+        statuses=None,
+        name_or_description: Optional[str] = None,
+        sort_order: Optional[BeakerSortOrder] = None,
+        sort_field: str = "created",
+        limit: Optional[int] = None,
+        **kwargs,
+    ) -> Iterable[pb2.Workload]:
+        b = self._beaker
+        if isinstance(workspace, str) and "/" in workspace:
+            # beaker-py resolves an "org/name" workspace with its own RPC on every call.
+            b._rpc("workspace.resolve")
+        b._rpc("workload.list")
+        now = b.clock.now()
+        with b._lock:
+            # Records are kept in creation order, so the created_after bound is a bisect.
+            start = 0
+            if created_after is not None:
+                start = bisect.bisect_right(b._created, created_after)
+            records = b._ordered[start:]
+
+        def matches(r: _Record) -> bool:
+            if created_before is not None and r.created >= created_before:
+                return False
+            if name_or_description and not (
+                name_or_description in r.name or name_or_description in r.description
+            ):
+                return False
+            if statuses is not None and r.status(now) not in {int(s) for s in statuses}:
+                return False
+            return True
+
+        if sort_order != BeakerSortOrder.ascending:
+            records.reverse()
+        matching = filter(matches, records)
+        if limit is not None:
+            matching = itertools.islice(matching, limit)
+
+        for i, r in enumerate(matching):
+            if i and i % self.MAX_PAGE_SIZE == 0:
+                b._rpc("workload.list")
+            yield self._to_pb2(r, now)
+
+    def get(self, workload: str) -> pb2.Workload:
+        b = self._beaker
+        b._rpc("workload.get")
+        with b._lock:
+            r = b._records.get(workload)
+        if r is None:
+            raise BeakerWorkloadNotFound(workload)
+        return self._to_pb2(r, b.clock.now())
+
+    def get_latest_job(self, workload: pb2.Workload, **kwargs) -> Optional[pb2.Job]:
+        b = self._beaker
+        b._rpc("workload.get_latest_job")
+        with b._lock:
+            r = b._records.get(workload.experiment.id)
+        if r is None:
+            raise BeakerWorkloadNotFound(workload.experiment.id)
+        status = r.status(b.clock.now())
+        if status in (pb2.WorkloadStatus.STATUS_SUBMITTED, pb2.WorkloadStatus.STATUS_QUEUED):
+            return None
+        return pb2.Job(id=f"{r.id}-job", status=pb2.JobStatus(status=status))
+
+    def update(
+        self,
+        workload: pb2.Workload,
+        *,
+        name: Optional[str] = None,
+        description: Optional[str] = None,
+    ) -> pb2.Workload:
+        b = self._beaker
+        b._rpc("workload.update")
+        with b._lock:
+            r = b._records.get(workload.experiment.id)
+            if r is None:
+                raise BeakerWorkloadNotFound(workload.experiment.id)
+            if name is not None:
+                r.name = name
+            if description is not None:
+                r.description = description
+        return self._to_pb2(r, b.clock.now())
+
+    def url(self, workload: pb2.Workload) -> str:
+        return f"{self._beaker.config.agent_address}/ex/{workload.experiment.id}"
+
+
+class FakeWorkspaceClient:
+    def __init__(self, beaker: "FakeBeaker"):
+        self._beaker = beaker
+
+    def get(self, workspace: Optional[str] = None) -> pb2.Workspace:
+        self._beaker._rpc("workspace.get")
+        name = workspace or "fake/workspace"
+        return pb2.Workspace(id=f"01FAKEWS{abs(hash(name)) % 10**12:012d}", name=name)
+
+
+class FakeBeaker:
+    """In-memory Beaker workspace with simulated latency and experiment lifecycles.
+
+    `latency` is the simulated duration of each RPC (one per page for
+    `list`). New experiments from `submit()` queue for `queue_time`, run for
+    `run_time`, then fail with probability `failure_rate`. The workspace is
+    pre-populated with `workspace_size` finished workloads, a
+    `tagged_fraction` of which carry a `(bipelines:<hash>)` tag for unrelated
+    hashes. Per-method RPC counts are kept in `calls`.
+    """
+
+    def __init__(
+        self,
+        clock: Optional[SimClock] = None,
+        latency: float = 0.05,
+        queue_time: float = 60.0,
+        run_time: float = 600.0,
+        failure_rate: float = 0.0,
+        workspace_size: int = 0,
+        tagged_fraction: float = 0.5,
+        seed: int = 0,
+    ):
+        self.clock = clock or SimClock()
+        self.latency = latency
+        self.queue_time = queue_time
+        self.run_time = run_time
+        self.failure_rate = failure_rate
+        self.config = SimpleNamespace(agent_address="https://beaker.org")
+        self.workload = FakeWorkloadClient(self)
+        self.workspace = FakeWorkspaceClient(self)
+        self.calls: Counter = Counter()
+
+        self._lock = threading.Lock()
+        self._records: Dict[str, _Record] = {}
+        self._ordered: List[_Record] = []
+        self._created: List[datetime] = []
+        self._ids = itertools.count()
+        self._rng = random.Random(seed)
+        self._populate(workspace_size, tagged_fraction)
+
+    def _next_id(self) -> str:
+        return f"01FAKE{next(self._ids):020d}"
+
+    def _populate(self, n: int, tagged_fraction: float):
+        now = self.clock.now()
+        for i in range(n):
+            created = now - timedelta(days=2, seconds=(n - i) * 60)
+            tag = f"(bipelines:{self._rng.getrandbits(48):012x}) " if self._rng.random() < tagged_fraction else ""
+            r = _Record(
+                id=self._next_id(),
+                name=f"old-{i}",
+                description=f"{tag}historical experiment {i}",
+                created=created,
+                queue_time=0.0,
+                run_time=0.0,
+                outcome=pb2.WorkloadStatus.STATUS_SUCCEEDED,
+            )
+            self._add(r)
+
+    def _add(self, r: _Record):
+        self._records[r.id] = r
+        self._ordered.append(r)
+        self._created.append(r.created)
+
+    def _rpc(self, method: str):
+        with self._lock:
+            self.calls[method] += 1
+        self.clock.sleep(self.latency)
+
+    def submit(self, name: str, description: str = "") -> str:
+        """Create an experiment as a launcher would. Returns its id."""
+        failed = self._rng.random() < self.failure_rate
+        r = _Record(
+            id=self._next_id(),
+            name=name,
+            description=description,
+            created=self.clock.now(),
+            queue_time=self.queue_time,
+            run_time=self.run_time,
+            outcome=(
+                pb2.WorkloadStatus.STATUS_FAILED if failed else pb2.WorkloadStatus.STATUS_SUCCEEDED
+            ),
+        )
+        with self._lock:
+            # Created under the lock so creation order matches list order.
+            r.created = self.clock.now()
+            self._add(r)
+        return r.id
+
+    def workloads(self) -> List[str]:
+        with self._lock:
+            return list(self._records)
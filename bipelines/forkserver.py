@@ -0,0 +1,362 @@
+import json
+import os
+import re
+import shlex
+import signal
+import subprocess
+import threading
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional
+
+from rich.console import Console
+
+from bipelines.runner import CommandResult
+
+console = Console()
+
+
+def sprint(*args, **kwargs):
+    try:
+        console.print(*args, **kwargs)
+    except Exception:
+        plain = " ".join(str(a) for a in args)
+        print(plain)
+
+
+# Runs inside the lib's venv interpreter. Imports the preload modules once,
+# then forks a child per request that runs the launcher script in-process
+# via runpy, with stdout/stderr going to the task's log. Requests arrive as
+# JSON lines on stdin; the child pid and exit code are reported on stdout.
+_SERVER_SCRIPT = """\
+import atexit, json, os, runpy, select, sys, traceback
+
+# Replies get a private copy of stdout; anything printed while preloading goes to stderr.
+replies = os.fdopen(os.dup(1), "w")
+os.dup2(2, 1)
+
+def reply(msg):
+    replies.write(json.dumps(msg) + "\\n")
+    replies.flush()
+
+def exitcode(status):
+    return -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+
+def child(req):
+    os.setsid()
+    os.close(replies.fileno())
+    null = os.open(os.devnull, os.O_RDONLY)
+    log = os.open(req["log"], os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    os.dup2(null, 0)
+    os.dup2(log, 1)
+    os.dup2(log, 2)
+    if req.get("cwd"):
+        os.chdir(req["cwd"])
+    os.environ.clear()
+    os.environ.update(req["env"])
+    argv = req["argv"]
+    code = 0
+    try:
+        if argv[0] == "-m":
+            sys.argv = argv[1:]
+            sys.path.insert(0, os.getcwd())
+            runpy.run_module(argv[1], run_name="__main__", alter_sys=True)
+        else:
+            sys.argv = argv
+            sys.path.insert(0, os.path.dirname(os.path.abspath(argv[0])))
+            runpy.run_path(argv[0], run_name="__main__")
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            code = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    try:
+        atexit._run_exitfuncs()
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally:
+        os._exit(code)
+
+for name in json.loads(sys.argv[1]):
+    try:
+        __import__(name)
+    except Exception as e:
+        print(f"bipelines fork server: could not preload {name}: {e}", file=sys.stderr)
+
+reply({"ready": True})
+stdin = sys.stdin.fileno()
+children = {}
+buf = b""
+reading = True
+while reading or children:
+    ready, _, _ = select.select([stdin] if reading else [], [], [], 0.02)
+    if ready:
+        data = os.read(stdin, 65536)
+        reading = bool(data)
+        buf += data
+        while b"\\n" in buf:
+            line, buf = buf.split(b"\\n", 1)
+            req = json.loads(line)
+            pid = os.fork()
+            if pid == 0:
+                child(req)
+            children[pid] = req["id"]
+            reply({"id": req["id"], "pid": pid})
+    while children:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if pid == 0:
+            break
+        reply({"id": children.pop(pid), "returncode": exitcode(status)})
+"""
+
+# Seconds to wait for a timed-out command's exit status once it has been killed.
+KILL_GRACE = 30.0
+
+_PYTHON_RE = re.compile(r"python(3(\.\d+)?)?")
+
+
+class ForkServerError(RuntimeError):
+    """The fork server is unavailable; run the command the normal way instead."""
+
+
+def python_argv(command: str) -> Optional[List[str]]:
+    """Interpreter arguments of a plain `python script.py ...` / `python -m mod ...` command.
+
+    Returns None for anything that needs a shell (pipes, redirects, variable
+    expansion, env assignments, ...) or runs some other program.
+    """
+    if any(c in command for c in "$`\n"):
+        return None
+    try:
+        lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+        lexer.whitespace_split = True
+        parts = list(lexer)
+    except ValueError:
+        return None
+    if any(p and all(c in "();<>|&" for c in p) for p in parts):
+        return None
+    if len(parts) < 2 or not _PYTHON_RE.fullmatch(parts[0]):
+        return None
+    args = parts[1:]
+    if args[0] == "-m":
+        return args if len(args) >= 2 else None
+    return None if args[0].startswith("-") else args
+
+
+class _Request:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.pid: Optional[int] = None
+        self.returncode: Optional[int] = None
+        self.lost = False
+        # Timed out before the server reported the child's pid: kill it once it does.
+        self.kill = False
+
+
+class ForkServer:
+    """A pre-imported interpreter in one venv that forks a child per launcher command.
+
+    The server is started with the lib's environment and working directory,
+    imports `preload` once, and then runs each `python ...` launcher in a
+    forked child, so a launch pays for neither interpreter startup nor the
+    gantry/beaker imports. The child writes straight to the task's log; once
+    it exits, the new part of the log is fed through `tail`, `echo` and
+    `on_line` just like the regular runner's output.
+    """
+
+    def __init__(self, python: Path, cwd: Optional[str], env: dict, preload: List[str]):
+        self.python = python
+        self._lock = threading.Lock()
+        self._requests: Dict[int, _Request] = {}
+        self._next_id = 0
+        self._dead = False
+        self._proc = subprocess.Popen(
+            [str(python), "-c", _SERVER_SCRIPT, json.dumps(preload)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=cwd,
+            env=env,
+            text=True,
+            bufsize=1,
+            start_new_session=True,
+        )
+        ready = self._proc.stdout.readline()
+        if not ready:
+            self._proc.wait()
+            raise ForkServerError(f"fork server for {python} exited with code {self._proc.returncode}")
+        self._reader = threading.Thread(
+            target=self._read_replies, name="bipelines-forkserver", daemon=True
+        )
+        self._reader.start()
+
+    def _read_replies(self):
+        for line in self._proc.stdout:
+            try:
+                msg = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            with self._lock:
+                req = self._requests.get(msg.get("id"))
+            if req is None:
+                continue
+            with req.cond:
+                if "pid" in msg:
+                    req.pid = msg["pid"]
+                    if req.kill:
+                        _kill_group(req.pid)
+                if "returncode" in msg:
+                    req.returncode = msg["returncode"]
+                    if req.kill:
+                        with self._lock:
+                            self._requests.pop(msg["id"], None)
+                req.cond.notify_all()
+        with self._lock:
+            self._dead = True
+            pending = list(self._requests.values())
+        for req in pending:
+            with req.cond:
+                req.lost = True
+                req.cond.notify_all()
+
+    @property
+    def alive(self) -> bool:
+        return not self._dead and self._proc.poll() is None
+
+    def run(
+        self,
+        argv: List[str],
+        env: dict,
+        log_path: Path,
+        cwd: Optional[str] = None,
+        prefix: str = "",
+        timeout: Optional[float] = None,
+        on_line: Optional[Callable[[str], None]] = None,
+        tail: Optional[Deque[str]] = None,
+        echo: bool = True,
+    ) -> CommandResult:
+        """Run `python <argv>` in a forked child. Raises ForkServerError if the server is gone."""
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(log_path, "a", errors="replace") as log:
+            log.write(f"$ python {shlex.join(argv)}  # fork server\n")
+            offset = log.tell()
+
+        req = _Request()
+        with self._lock:
+            if self._dead or not self.alive:
+                raise ForkServerError(f"fork server for {self.python} is not running")
+            req_id = self._next_id
+            self._next_id += 1
+            self._requests[req_id] = req
+            try:
+                self._proc.stdin.write(
+                    json.dumps(
+                        {"id": req_id, "argv": argv, "env": env, "cwd": cwd, "log": str(log_path)}
+                    )
+                    + "\n"
+                )
+                self._proc.stdin.flush()
+            except OSError as e:
+                self._requests.pop(req_id, None)
+                raise ForkServerError(f"fork server for {self.python} is not running: {e}")
+
+        timed_out = False
+        try:
+            with req.cond:
+                if not req.cond.wait_for(lambda: req.returncode is not None or req.lost, timeout):
+                    timed_out = True
+                    req.kill = True
+                    if req.pid is not None:
+                        _kill_group(req.pid)
+                    # Bounded: the kill may still be pending on a pid that never arrives.
+                    req.cond.wait_for(lambda: req.returncode is not None or req.lost, KILL_GRACE)
+                if req.lost and req.returncode is None and not req.kill:
+                    raise ForkServerError(f"fork server for {self.python} exited mid-command")
+        finally:
+            # A timed-out command the server hasn't finished stays registered, so the
+            # reader can still kill it (and then drop it) when its pid or exit arrives.
+            if not (req.kill and req.returncode is None and not req.lost):
+                with self._lock:
+                    self._requests.pop(req_id, None)
+
+        with open(log_path, errors="replace") as log:
+            log.seek(offset)
+            for raw in log:
+                line = raw.rstrip("\n")
+                if tail is not None:
+                    tail.append(line)
+                if echo:
+                    print(f"  {prefix}{line}", flush=True)
+                if on_line is not None:
+                    on_line(line)
+
+        returncode = req.returncode if req.returncode is not None else -signal.SIGKILL
+        return CommandResult(returncode=returncode, timed_out=timed_out)
+
+    def terminate(self):
+        """Kill the server and every child it is running; their commands return as killed."""
+        with self._lock:
+            requests = list(self._requests.values())
+        for req in requests:
+            with req.cond:
+                req.kill = True
+                if req.pid is not None:
+                    _kill_group(req.pid)
+        # The server leads its own process group (start_new_session).
+        _kill_group(self._proc.pid)
+
+    def close(self):
+        """Stop accepting commands; the server exits once its running children finish."""
+        with self._lock:
+            try:
+                self._proc.stdin.close()
+            except OSError:
+                pass
+
+
+def _kill_group(pid: int):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+class ForkServerPool:
+    """One lazily started ForkServer per venv interpreter."""
+
+    def __init__(self, preload: List[str]):
+        self.preload = preload
+        self._lock = threading.Lock()
+        self._servers: Dict[Path, Optional[ForkServer]] = {}
+
+    def get(self, python: Path, cwd: Optional[str], env: dict) -> Optional[ForkServer]:
+        """The server for `python`, starting it if needed. None if it can't be started."""
+        with self._lock:
+            if python in self._servers:
+                server = self._servers[python]
+                # A server that failed to start isn't retried; one that died is restarted.
+                if server is None or server.alive:
+                    return server
+            try:
+                server = ForkServer(python, cwd, env, self.preload)
+            except (OSError, ForkServerError) as e:
+                sprint(f"  [dim]Warning: could not start fork server ({e}); launching normally[/dim]")
+                server = None
+            self._servers[python] = server
+            return server
+
+    def terminate(self):
+        """Kill every server and the commands they are running."""
+        with self._lock:
+            servers = [s for s in self._servers.values() if s is not None]
+        for server in servers:
+            server.terminate()
+
+    def close(self):
+        with self._lock:
+            for server in self._servers.values():
+                if server is not None:
+                    server.close()
+            self._servers.clear()
@@ -0,0 +1,156 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    workspace TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    experiment_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (workspace, hash)
+);
+CREATE TABLE IF NOT EXISTS syncs (
+    workspace TEXT PRIMARY KEY,
+    synced_at REAL NOT NULL
+);
+"""
+
+
+# Statuses an entry can hold, stored in IndexEntry as an index into this tuple.
+STATUSES = ("pending", "running", "completed", "failed", "canceled", "unknown")
+_STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+_UNKNOWN = _STATUS_CODES["unknown"]
+
+
+class IndexEntry:
+    """The latest experiment launched for a task hash, as last seen on Beaker.
+
+    A config can hold tens of thousands of these, so each is a slotted record
+    with its status interned as a small int; the experiment URL is derived
+    from the id when needed rather than stored.
+    """
+
+    __slots__ = ("experiment_id", "_status", "created", "last_seen")
+
+    def __init__(self, experiment_id: str, status: str, created: float, last_seen: float):
+        self.experiment_id = experiment_id
+        self.status = status
+        self.created = created
+        self.last_seen = last_seen
+
+    @property
+    def status(self) -> str:
+        return STATUSES[self._status]
+
+    @status.setter
+    def status(self, status: str):
+        self._status = _STATUS_CODES.get(status, _UNKNOWN)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, IndexEntry):
+            return NotImplemented
+        return (self.experiment_id, self._status, self.created, self.last_seen) == (
+            other.experiment_id, other._status, other.created, other.last_seen
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"IndexEntry(experiment_id={self.experiment_id!r}, status={self.status!r}, "
+            f"created={self.created!r}, last_seen={self.last_seen!r})"
+        )
+
+
+class DedupIndex:
+    """SQLite-backed map of task hash → experiment, kept per Beaker workspace.
+
+    Lets a restart fetch only the workloads created since the previous sync
+    instead of re-listing the whole workspace history. Safe to share between
+    the scheduler's worker threads.
+    """
+
+    def __init__(self, path: Path, workspace: str, readonly: bool = False):
+        self.path = path
+        self.workspace = workspace
+        self._lock = threading.Lock()
+        if readonly:
+            # Fails if the index doesn't exist yet rather than creating it.
+            self._conn = sqlite3.connect(
+                f"file:{path}?mode=ro", uri=True, check_same_thread=False
+            )
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def last_sync(self) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT synced_at FROM syncs WHERE workspace = ?", (self.workspace,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def mark_synced(self, synced_at: float):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO syncs (workspace, synced_at) VALUES (?, ?) "
+                "ON CONFLICT(workspace) DO UPDATE SET synced_at = excluded.synced_at",
+                (self.workspace, synced_at),
+            )
+
+    _UPSERT_SQL = (
+        "INSERT INTO tasks (workspace, hash, experiment_id, status, created, last_seen) "
+        "VALUES (?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(workspace, hash) DO UPDATE SET "
+        "experiment_id = excluded.experiment_id, status = excluded.status, "
+        "created = CASE WHEN excluded.experiment_id = tasks.experiment_id "
+        "THEN tasks.created ELSE excluded.created END, "
+        "last_seen = excluded.last_seen "
+        "WHERE excluded.created >= tasks.created "
+        "OR excluded.experiment_id = tasks.experiment_id"
+    )
+
+    def upsert(
+        self,
+        task_hash: str,
+        experiment_id: str,
+        status: str,
+        created: Optional[float] = None,
+    ):
+        """Record an experiment for a hash, keeping whichever experiment is newest."""
+        self.upsert_many([(task_hash, experiment_id, status, created)])
+
+    def upsert_many(self, rows: Iterable[Tuple[str, str, str, Optional[float]]]):
+        """`upsert` for many (hash, experiment_id, status, created) rows in one transaction."""
+        now = time.time()
+        params = [
+            (self.workspace, h, exp_id, status, now if created is None else created, now)
+            for h, exp_id, status, created in rows
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(self._UPSERT_SQL, params)
+
+    def get_many(self, hashes: Iterable[str]) -> Dict[str, IndexEntry]:
+        """Look up the entries for the given hashes; unknown hashes are omitted."""
+        wanted = list(dict.fromkeys(hashes))
+        found: Dict[str, IndexEntry] = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit.
+            for i in range(0, len(wanted), 500):
+                chunk = wanted[i : i + 500]
+                rows = self._conn.execute(
+                    "SELECT hash, experiment_id, status, created, last_seen FROM tasks "
+                    f"WHERE workspace = ? AND hash IN ({','.join('?' * len(chunk))})",
+                    (self.workspace, *chunk),
+                )
+                for h, exp_id, status, created, last_seen in rows:
+                    found[h] = IndexEntry(exp_id, status, created, last_seen)
+        return found
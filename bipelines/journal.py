@@ -0,0 +1,91 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from bipelines.index import IndexEntry
+from bipelines.status import TERMINAL_STATUSES
+
+# Events that tie a task hash to a Beaker experiment.
+_ATTACH_EVENTS = ("launched", "attached")
+
+
+class RunJournal:
+    """Append-only JSONL record of task state transitions for one run.
+
+    Every line is flushed and fsynced before `record` returns, so after a
+    crash the journal holds everything up to the last transition. `replay`
+    reads it back into the experiment each task was following, letting a
+    restarted run re-attach to in-flight experiments by id instead of
+    searching Beaker or re-running their launchers.
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def record(self, task_hash: str, event: str, **fields):
+        line = json.dumps({"t": time.time(), "hash": task_hash, "event": event, **fields})
+        with self._lock:
+            if self._file is None:
+                self._file = self._open()
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _open(self):
+        f = open(self.path, "a+")
+        # Terminate a line torn by a crash so the next record starts cleanly.
+        if f.tell() > 0:
+            f.seek(f.tell() - 1)
+            if f.read(1) != "\n":
+                f.write("\n")
+        return f
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def replay(self) -> Dict[str, IndexEntry]:
+        """The latest experiment recorded for each task hash, with its last known status."""
+        entries: Dict[str, IndexEntry] = {}
+        try:
+            f = open(self.path)
+        except FileNotFoundError:
+            return entries
+        with f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                task_hash = rec.get("hash")
+                exp_id = rec.get("experiment_id")
+                status: Optional[str] = rec.get("status")
+                event = rec.get("event")
+
+                if event in _ATTACH_EVENTS and exp_id:
+                    entries[task_hash] = IndexEntry(
+                        experiment_id=exp_id,
+                        status=status or "pending",
+                        created=rec.get("created", rec["t"]),
+                        last_seen=rec["t"],
+                    )
+                    continue
+
+                entry = entries.get(task_hash)
+                if entry is None or not status:
+                    continue
+                if event == "status" and exp_id == entry.experiment_id:
+                    entry.status = status
+                    entry.last_seen = rec["t"]
+                elif event == "finished" and status in TERMINAL_STATUSES:
+                    entry.status = status
+                    entry.last_seen = rec["t"]
+        return entries
@@ -1,13 +1,17 @@
 import argparse
+import hashlib
+import importlib.metadata
 import json
+import shutil
 import subprocess
 import sys
+import time
 from pathlib import Path
 from typing import List, Optional, Union
 
 from rich.console import Console
 
-from bipelines.config import BipelineConfig
+from bipelines.config import BipelineConfig, load_config_from_yaml
 
 console = Console()
 
@@ -52,18 +56,109 @@ def _get_git_info() -> tuple[str, str]:
     return url, branch
 
 
+BIPELINES_GIT_URL = "https://github.com/davidheineman/bipelines.git"
+
+
+def _bipelines_version() -> str:
+    try:
+        return importlib.metadata.version("bipelines")
+    except importlib.metadata.PackageNotFoundError:
+        return "0+unknown"
+
+
+def _source_root() -> Optional[Path]:
+    """The checkout bipelines is installed from, or None for a regular install."""
+    root = Path(__file__).resolve().parent.parent
+    return root if (root / "pyproject.toml").exists() else None
+
+
+def _remote_commit(version: str) -> str:
+    """The GitHub commit matching an installed `version`: its `v<version>` tag, else the default branch."""
+    for ref in (f"refs/tags/v{version}^{{}}", f"refs/tags/v{version}", "HEAD"):
+        heads = subprocess.run(
+            ["git", "ls-remote", BIPELINES_GIT_URL, ref],
+            check=True, capture_output=True, text=True,
+        ).stdout.split()
+        if heads:
+            return heads[0]
+    raise RuntimeError(f"Could not resolve a commit of {BIPELINES_GIT_URL}")
+
+
+def _bipelines_build() -> tuple[str, str]:
+    """The bipelines build to install into the launch env: (build id, source to build from).
+
+    The id is the version, plus a fingerprint of what gets built. For a
+    checkout that is a hash of pyproject.toml and the package's files, since
+    a checkout's version rarely changes; otherwise it is the GitHub commit
+    the wheel is built from, so the cached wheel always matches its key.
+    """
+    version = _bipelines_version()
+    root = _source_root()
+    if root is None:
+        commit = _remote_commit(version)
+        return f"{version}+g{commit[:12]}", f"git+{BIPELINES_GIT_URL}@{commit}"
+    digest = hashlib.sha256()
+    for path in [root / "pyproject.toml", *sorted((root / "bipelines").rglob("*.py"))]:
+        digest.update(str(path.relative_to(root)).encode() + b"\0")
+        digest.update(path.read_bytes())
+    return f"{version}+{digest.hexdigest()[:12]}", str(root)
+
+
+def _bipelines_wheel(
+    wheel_dir: Path, build_id: str, source: str, uv: Optional[str], uv_env: dict
+) -> Path:
+    """Return a cached wheel for this bipelines build, building it once if needed.
+
+    Builds from `source`: the local source tree when bipelines is installed
+    from a checkout, otherwise a pinned commit of the GitHub repo. Wheels are
+    cached per build id (see `_bipelines_build`), since a checkout's wheel
+    name doesn't change with its source.
+    """
+    wheel_dir = wheel_dir / build_id
+    cached = sorted(wheel_dir.glob("bipelines-*.whl"))
+    if cached:
+        return cached[-1]
+
+    console.print(f"[dim]Building bipelines {build_id} wheel...[/dim]")
+    wheel_dir.mkdir(parents=True, exist_ok=True)
+    devnull = {"stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+    if uv and not source.startswith("git+"):
+        subprocess.run(
+            [uv, "build", "--wheel", "--out-dir", str(wheel_dir), source],
+            env=uv_env, check=True, **devnull,
+        )
+    else:
+        subprocess.run(
+            [sys.executable, "-m", "pip", "wheel", "--no-deps", "-w", str(wheel_dir), source],
+            check=True, **devnull,
+        )
+
+    built = sorted(wheel_dir.glob("bipelines-*.whl"), key=lambda p: p.stat().st_mtime)
+    if not built:
+        raise RuntimeError(f"Building the bipelines wheel in {wheel_dir} produced no wheel")
+    return built[-1]
+
+
 def _ensure_launch_env(base_dir: str = ".bipelines") -> tuple[Path, str]:
     """Maintain a clean repo clone + venv under base_dir/launch/ for gantry.
 
+    The clone is only fetched when the remote branch has moved. The venv is
+    keyed by the bipelines build (launch/venv-<build id>: the version, plus a
+    source fingerprint or the GitHub commit it is built from), so upgrading
+    or editing bipelines rebuilds it; it is installed from a locally cached wheel and marked
+    complete only once the install succeeds.
+
     Returns (repo_path, venv_python_path).
     """
-    from bipelines.local_env import _find_uv
+    from bipelines.local_env import _env_with_uv, _find_uv
 
     launch_root = Path(base_dir).resolve() / "launch"
     repo_path = launch_root / "repo"
-    venv_path = launch_root / "venv"
+    build_id, source = _bipelines_build()
+    venv_path = launch_root / f"venv-{build_id}"
     url, branch = _get_git_info()
     uv = _find_uv()
+    uv_env = _env_with_uv(Path(base_dir).resolve())
     venv_python = str(venv_path / "bin" / "python")
 
     launch_root.mkdir(parents=True, exist_ok=True)
@@ -77,36 +172,52 @@ def _ensure_launch_env(base_dir: str = ".bipelines") -> tuple[Path, str]:
             check=True, **devnull,
         )
     else:
-        subprocess.run(
-            ["git", "fetch", "origin", branch, "--depth", "1"],
-            cwd=str(repo_path), check=True, **devnull,
-        )
-        subprocess.run(
-            ["git", "checkout", "FETCH_HEAD"],
-            cwd=str(repo_path), check=True, **devnull,
-        )
-
-    if not venv_path.exists():
-        console.print("[dim]Creating launch venv...[/dim]")
-        if uv:
-            subprocess.run([uv, "venv", str(venv_path)], check=True, **devnull)
-        else:
+        remote = subprocess.run(
+            ["git", "ls-remote", "origin", f"refs/heads/{branch}"],
+            cwd=str(repo_path), check=True, capture_output=True, text=True,
+        ).stdout.split()
+        local = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=str(repo_path), check=True, capture_output=True, text=True,
+        ).stdout.strip()
+        if not remote or remote[0] != local:
             subprocess.run(
-                [sys.executable, "-m", "venv", str(venv_path)], check=True
+                ["git", "fetch", "origin", branch, "--depth", "1"],
+                cwd=str(repo_path), check=True, **devnull,
+            )
+            subprocess.run(
+                ["git", "checkout", "FETCH_HEAD"],
+                cwd=str(repo_path), check=True, **devnull,
             )
 
+    installed_marker = venv_path / ".bipelines-installed"
+    if not installed_marker.exists():
+        for stale in [*launch_root.glob("venv*"), *launch_root.glob("wheels/*")]:
+            if stale not in (venv_path, launch_root / "wheels" / build_id):
+                shutil.rmtree(stale, ignore_errors=True)
+
+        if not venv_path.exists():
+            console.print(f"[dim]Creating launch venv for bipelines {build_id}...[/dim]")
+            if uv:
+                subprocess.run([uv, "venv", str(venv_path)], env=uv_env, check=True, **devnull)
+            else:
+                subprocess.run(
+                    [sys.executable, "-m", "venv", str(venv_path)], check=True
+                )
+
+        wheel = _bipelines_wheel(launch_root / "wheels", build_id, source, uv, uv_env)
         console.print("[dim]Installing bipelines into launch venv...[/dim]")
-        bipelines_pkg = "bipelines @ git+https://github.com/davidheineman/bipelines.git"
         if uv:
             subprocess.run(
-                [uv, "pip", "install", "--python", venv_python, bipelines_pkg],
-                check=True, **devnull,
+                [uv, "pip", "install", "--python", venv_python, str(wheel)],
+                env=uv_env, check=True, **devnull,
             )
         else:
             subprocess.run(
-                [venv_python, "-m", "pip", "install", bipelines_pkg],
+                [venv_python, "-m", "pip", "install", str(wheel)],
                 check=True, **devnull,
             )
+        installed_marker.write_text(f"{build_id}\n")
 
     return repo_path, venv_python
 
@@ -125,9 +236,19 @@ def launch(
     env: Optional[List[str]] = None,
     secrets: Optional[List[str]] = None,
     extra_args: Optional[List[str]] = None,
+    shards: int = 1,
 ):
     """Launch a bipelines run on Beaker via gantry, from a clean local clone
     so that uncommitted changes in the working tree don't cause gantry warnings.
+
+    With `shards > 1`, launches that many parent jobs, each running the same
+    config with `--shard-index i --shard-count shards`: every parent launches
+    only the task hashes it owns and follows the rest through their tags.
+    Every parent is also given the launch time (`--shards-started`), so it
+    can tell other shards' experiments from ones left over by earlier runs,
+    and the same commit for each repo that only names a branch.
+    Logs aren't streamed for sharded launches, since that would block on the
+    first parent.
     """
     env = env or []
     secrets = secrets or []
@@ -145,6 +266,9 @@ def launch(
     else:
         task_args = ["bipelines", "--config", config] + extra_args
 
+    if shards < 1:
+        raise ValueError(f"shards must be at least 1, got {shards}")
+
     repo_path, venv_python = _ensure_launch_env()
 
     params = {
@@ -161,6 +285,53 @@ def launch(
         "dry_run": dry_run,
     }
 
+    if shards == 1:
+        _run_launch_script(venv_python, repo_path, params)
+        return
+
+    started = f"{time.time():.0f}"
+    pins = _pin_branch_heads(
+        config if isinstance(config, BipelineConfig) else load_config_from_yaml(config)
+    )
+    for i in range(shards):
+        console.print(f"[bold]Launching shard {i} of {shards}[/bold]")
+        _run_launch_script(
+            venv_python,
+            repo_path,
+            {
+                **params,
+                "args": task_args + pins + [
+                    "--shard-index", str(i), "--shard-count", str(shards), "--shards-started", started,
+                ],
+                "name": f"{name}-shard{i}of{shards}",
+                "description": f"{description} (shard {i} of {shards})",
+                "show_logs": False,
+            },
+        )
+
+
+def _pin_branch_heads(config: BipelineConfig) -> List[str]:
+    """`--repo-commit` args pinning every repo without a `commit` to its branch's current head.
+
+    Resolved once, before any shard starts, so all shards check out (and, with
+    content dedup keys, hash) the same commits even if a branch moves meanwhile.
+    """
+    args = []
+    for repo in config.repos:
+        if repo.commit:
+            continue
+        heads = subprocess.check_output(
+            ["git", "ls-remote", repo.url, f"refs/heads/{repo.branch}"], text=True
+        ).split()
+        if not heads:
+            raise RuntimeError(f"Branch {repo.branch} not found in {repo.url}")
+        console.print(f"[dim]Pinning {repo.name} to {repo.branch} at {heads[0][:12]}[/dim]")
+        args += ["--repo-commit", f"{repo.name}={heads[0]}"]
+    return args
+
+
+def _run_launch_script(venv_python: str, repo_path: Path, params: dict):
+    """Create and launch one gantry Recipe from `params`, streaming gantry's output."""
     proc = subprocess.Popen(
         [venv_python, "-c", _LAUNCH_SCRIPT],
         stdin=subprocess.PIPE,
@@ -193,6 +364,10 @@ def main():
     parser.add_argument("--dry-run", action="store_true", default=False)
     parser.add_argument("--env", type=str, nargs="*", default=[], metavar="KEY=VALUE")
     parser.add_argument("--secret", type=str, nargs="*", default=[], metavar="ENV_VAR=SECRET_NAME")
+    parser.add_argument(
+        "--shards", type=int, default=1,
+        help="Split the config across this many parent jobs, each launching its own subset of tasks",
+    )
 
     parser.add_argument(
         "--config", "-c", type=str, required=True,
@@ -213,6 +388,7 @@ def main():
         env=args.env,
         secrets=args.secret,
         extra_args=extra,
+        shards=args.shards,
     )
 
 
@@ -1,9 +1,13 @@
+import hashlib
+import json
 import os
 import shutil
 import subprocess
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional
 
 from rich.console import Console
 
@@ -32,89 +36,319 @@ def _find_uv() -> str | None:
     return None
 
 
-def _env_with_uv() -> dict:
-    """Return a copy of os.environ with uv's directory on PATH (if found)."""
+def _env_with_uv(env_dir: Optional[Path] = None) -> dict:
+    """Return a copy of os.environ with uv's directory on PATH (if found).
+
+    With env_dir, uv also uses the shared cache under env_dir/uv-cache and
+    hardlinks packages out of it, unless the caller's environment already
+    configures either.
+    """
     env = {**os.environ}
     uv = _find_uv()
     if uv:
         uv_dir = str(Path(uv).parent)
         env["PATH"] = f"{uv_dir}:{env.get('PATH', '')}"
+    if env_dir is not None:
+        env.setdefault("UV_CACHE_DIR", str(Path(env_dir) / "uv-cache"))
+        env.setdefault("UV_LINK_MODE", "hardlink")
     return env
 
 
-def repo_venv_env(repo_path: Path) -> dict:
+def repo_venv_env(repo_path: Path, env_dir: Optional[Path] = None) -> dict:
     """Return an env dict that activates the venv at repo_path/.venv."""
     venv_path = repo_path / ".venv"
-    env = _env_with_uv()
+    env = _env_with_uv(env_dir)
     env["VIRTUAL_ENV"] = str(venv_path)
     env["PATH"] = f"{venv_path / 'bin'}:{env['PATH']}"
     env.pop("PYTHONHOME", None)
     return env
 
 
-def setup_local_env(
-    repos: List[RepoConfig],
-    env_dir: str = ".bipelines",
+def _git(*args: str, cwd: Optional[Path] = None, check: bool = True) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        ["git", *args],
+        cwd=str(cwd) if cwd else None,
+        check=check,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+
+
+def _has_commit(git_dir: Path, commit: str) -> bool:
+    return _git("cat-file", "-e", f"{commit}^{{commit}}", cwd=git_dir, check=False).returncode == 0
+
+
+def _mirror_path(cache_path: Path, url: str) -> Path:
+    """One bare mirror per remote URL, shared by every checkout of that URL."""
+    name = url.rstrip("/").split("/")[-1].removesuffix(".git")
+    digest = hashlib.sha256(url.encode()).hexdigest()[:8]
+    return cache_path / f"{name}-{digest}.git"
+
+
+_mirror_locks: Dict[Path, threading.Lock] = {}
+_mirror_locks_guard = threading.Lock()
+
+
+def _sync_mirror(repo: RepoConfig, mirror: Path) -> None:
+    """Create or update the shared full mirror, skipping the network when it's already current.
+
+    The mirror holds blobs too, so checkouts that borrow from it find the files
+    they check out locally. A blobless mirror left by an older version is
+    filled in once, in place, since existing checkouts reference it.
+    """
+    with _mirror_locks_guard:
+        lock = _mirror_locks.setdefault(mirror, threading.Lock())
+
+    with lock:
+        if not mirror.exists():
+            console.print(f"  [cyan]{repo.name}[/cyan]: mirroring {repo.url}...")
+            _git("clone", "--mirror", repo.url, str(mirror))
+            return
+
+        if _git("config", "--get", "remote.origin.partialclonefilter", cwd=mirror, check=False).returncode == 0:
+            console.print(f"  [cyan]{repo.name}[/cyan]: filling in blobless mirror of {repo.url}...")
+            _git("fetch", "--refetch", "--no-filter", "--prune", "origin", cwd=mirror)
+            _git("config", "--unset", "remote.origin.partialclonefilter", cwd=mirror)
+            _git("config", "--unset", "remote.origin.promisor", cwd=mirror, check=False)
+
+        if repo.commit and _has_commit(mirror, repo.commit):
+            return
+
+        _git("fetch", "--prune", "origin", cwd=mirror)
+        if repo.commit and not _has_commit(mirror, repo.commit):
+            # Commits not reachable from any advertised ref must be fetched by SHA.
+            _git("fetch", "origin", repo.commit, cwd=mirror)
+
+
+INSTALL_FINGERPRINT = ".bipelines-install.json"
+
+# Files whose contents decide what `repo.install` resolves to.
+DEPENDENCY_FILE_PATTERNS = [
+    "pyproject.toml",
+    "setup.py",
+    "setup.cfg",
+    "uv.lock",
+    "poetry.lock",
+    "Pipfile.lock",
+    "requirements*.txt",
+    "constraints*.txt",
+]
+
+
+def _venv_python_version(venv_path: Path) -> str:
+    """Read the interpreter version recorded in the venv's pyvenv.cfg."""
+    try:
+        for line in (venv_path / "pyvenv.cfg").read_text().splitlines():
+            key, _, value = line.partition("=")
+            if key.strip() in ("version", "version_info"):
+                return value.strip()
+    except OSError:
+        pass
+    return ""
+
+
+def _dependency_hashes(repo_path: Path) -> Dict[str, str]:
+    deps = {}
+    for pattern in DEPENDENCY_FILE_PATTERNS:
+        for f in sorted(repo_path.glob(pattern)):
+            deps[f.name] = hashlib.sha256(f.read_bytes()).hexdigest()
+    return deps
+
+
+def install_fingerprint(repo: RepoConfig, repo_path: Path) -> str:
+    """Summarise everything that affects `repo.install`: commit, install command,
+    dependency files and the venv's Python version."""
+    commit = _git("rev-parse", "HEAD", cwd=repo_path).stdout.strip()
+    return json.dumps(
+        {
+            "commit": commit,
+            "install": repo.install,
+            "dependencies": _dependency_hashes(repo_path),
+            "python": _venv_python_version(repo_path / ".venv"),
+        },
+        indent=2,
+        sort_keys=True,
+    )
+
+
+# ── Venv templates ─────────────────────────────────────────────────────
+#
+# A template is the frozen, fully resolved requirement set of a venv that
+# installed successfully, stored at venvs/<key>/requirements.txt where key
+# hashes that set and the Python version. venvs/inputs/<hash> maps a repo's
+# install inputs (install command + dependency files) to the template they
+# resolved to, so a fresh venv for the same inputs can be materialised with
+# `uv pip sync`, hardlinking every package out of the shared uv cache instead
+# of resolving, downloading and building it again.
+
+
+def _install_inputs_key(repo: RepoConfig, repo_path: Path) -> str:
+    content = json.dumps(
+        {"install": repo.install, "dependencies": _dependency_hashes(repo_path)},
+        sort_keys=True,
+    )
+    return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+
+def _find_template(store: Path, inputs_key: str) -> Optional[Path]:
+    try:
+        key = (store / "inputs" / inputs_key).read_text().strip()
+    except OSError:
+        return None
+    requirements = store / key / "requirements.txt"
+    return requirements if requirements.exists() else None
+
+
+def _save_template(store: Path, inputs_key: str, venv_path: Path, env: dict) -> None:
+    """Freeze the venv's third-party packages into the content-addressed template store."""
+    uv = _find_uv()
+    if uv is None:
+        return
+    try:
+        frozen = subprocess.run(
+            [uv, "pip", "freeze", "--exclude-editable", "--python", str(venv_path / "bin" / "python")],
+            env=env,
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return
+
+    content = f"# python {_venv_python_version(venv_path)}\n{frozen}"
+    key = hashlib.sha256(content.encode()).hexdigest()[:16]
+    template_dir = store / key
+    if not (template_dir / "requirements.txt").exists():
+        template_dir.mkdir(parents=True, exist_ok=True)
+        tmp = template_dir / f"requirements.txt.{os.getpid()}.{threading.get_ident()}"
+        tmp.write_text(content)
+        tmp.replace(template_dir / "requirements.txt")
+    (store / "inputs").mkdir(parents=True, exist_ok=True)
+    (store / "inputs" / inputs_key).write_text(key)
+
+
+def _setup_repo(
+    repo: RepoConfig,
+    repos_path: Path,
+    cache_path: Path,
+    venv_store: Path,
+    base_env: dict,
 ) -> None:
-    """Clone repos and install each into its own isolated venv."""
-    env_path = Path(env_dir).resolve()
-    repos_path = env_path / "repos"
-    repos_path.mkdir(parents=True, exist_ok=True)
+    """Check out one repo from the shared mirror and install it into its own venv."""
+    repo_path = repos_path / repo.name
+    mirror = _mirror_path(cache_path, repo.url)
 
-    base_env = _env_with_uv()
+    _sync_mirror(repo, mirror)
 
-    for repo in repos:
-        repo_path = repos_path / repo.name
+    if not repo_path.exists():
+        console.print(f"  Cloning [cyan]{repo.url}[/cyan]...")
+        # The mirror is an alternate object store holding every object, so this
+        # only transfers refs, and the checkout reads its blobs from the mirror.
+        _git(
+            "clone", "--no-checkout", "--filter=blob:none",
+            "--reference", str(mirror), repo.url, str(repo_path),
+        )
 
-        if not repo_path.exists():
-            console.print(f"  Cloning [cyan]{repo.url}[/cyan]...")
-            subprocess.run(
-                ["git", "clone", repo.url, str(repo_path)],
-                check=True,
-            )
+    if repo.commit:
+        console.print(f"  [cyan]{repo.name}[/cyan]: checking out commit [yellow]{repo.commit[:12]}[/yellow]...")
+        if not _has_commit(repo_path, repo.commit):
+            _git("fetch", str(mirror), repo.commit, cwd=repo_path)
+        _git("checkout", "-q", repo.commit, cwd=repo_path)
+    elif repo.branch:
+        console.print(f"  [cyan]{repo.name}[/cyan]: checking out branch [yellow]{repo.branch}[/yellow]...")
+        _git(
+            "fetch", str(mirror),
+            f"+refs/heads/{repo.branch}:refs/remotes/origin/{repo.branch}",
+            cwd=repo_path,
+        )
+        if _git("rev-parse", "--verify", "-q", f"refs/heads/{repo.branch}", cwd=repo_path, check=False).returncode == 0:
+            _git("checkout", "-q", repo.branch, cwd=repo_path)
+            _git("merge", "--ff-only", "-q", f"origin/{repo.branch}", cwd=repo_path)
+        else:
+            _git("checkout", "-q", "-b", repo.branch, "--track", f"origin/{repo.branch}", cwd=repo_path)
 
-        if repo.commit:
-            console.print(f"  Checking out commit [yellow]{repo.commit[:12]}[/yellow]...")
-            subprocess.run(
-                ["git", "checkout", repo.commit],
-                cwd=str(repo_path),
-                check=True,
-            )
-        elif repo.branch:
-            console.print(f"  Checking out branch [yellow]{repo.branch}[/yellow]...")
-            subprocess.run(
-                ["git", "fetch", "origin", repo.branch],
-                cwd=str(repo_path),
-                check=True,
-            )
-            subprocess.run(
-                ["git", "checkout", repo.branch],
-                cwd=str(repo_path),
-                check=True,
-            )
-            subprocess.run(
-                ["git", "pull", "--ff-only"],
-                cwd=str(repo_path),
-                check=True,
-            )
+    venv_path = repo_path / ".venv"
+    inputs_key = _install_inputs_key(repo, repo_path) if repo.install else None
+    if not venv_path.exists():
+        console.print(f"  Creating venv for [cyan]{repo.name}[/cyan]...")
+        uv = _find_uv() or "uv"
+        subprocess.run(
+            [uv, "venv", str(venv_path)],
+            cwd=str(repo_path),
+            env=base_env,
+            check=True,
+        )
 
-        venv_path = repo_path / ".venv"
-        if not venv_path.exists():
-            console.print(f"  Creating venv for [cyan]{repo.name}[/cyan]...")
-            uv = _find_uv() or "uv"
+        template = _find_template(venv_store, inputs_key) if inputs_key else None
+        if template is not None:
+            console.print(
+                f"  [cyan]{repo.name}[/cyan]: seeding venv from template {template.parent.name}"
+            )
+            # Best effort: the install below still runs and fixes anything missing.
             subprocess.run(
-                [uv, "venv", str(venv_path)],
+                [uv, "pip", "sync", "--python", str(venv_path / "bin" / "python"), str(template)],
                 cwd=str(repo_path),
                 env=base_env,
-                check=True,
+                check=False,
             )
 
-        if repo.install:
-            console.print(f"  Installing [cyan]{repo.name}[/cyan]: {repo.install}")
-            subprocess.run(
-                repo.install,
-                shell=True,
-                cwd=str(repo_path),
-                env=repo_venv_env(repo_path),
-                check=True,
-            )
+    if repo.install:
+        fingerprint = install_fingerprint(repo, repo_path)
+        fingerprint_path = venv_path / INSTALL_FINGERPRINT
+        if fingerprint_path.exists() and fingerprint_path.read_text() == fingerprint:
+            console.print(f"  [cyan]{repo.name}[/cyan]: install up to date, skipping")
+            return
+
+        console.print(f"  Installing [cyan]{repo.name}[/cyan]: {repo.install}")
+        fingerprint_path.unlink(missing_ok=True)
+        subprocess.run(
+            repo.install,
+            shell=True,
+            cwd=str(repo_path),
+            env=repo_venv_env(repo_path, env_dir=repos_path.parent),
+            check=True,
+        )
+        fingerprint_path.write_text(fingerprint)
+        _save_template(venv_store, inputs_key, venv_path, base_env)
+
+
+def setup_local_env(
+    repos: List[RepoConfig],
+    env_dir: str = ".bipelines",
+    max_workers: int = 4,
+) -> None:
+    """Clone repos and install each into its own isolated venv, up to max_workers at a time.
+
+    Clones share a full bare mirror per URL under env_dir/git-cache, so
+    re-creating a checkout or pinning a new commit only touches the network
+    for objects that aren't cached yet. Venvs share one uv cache under
+    env_dir/uv-cache and are seeded from templates in env_dir/venvs.
+    """
+    env_path = Path(env_dir).resolve()
+    repos_path = env_path / "repos"
+    cache_path = env_path / "git-cache"
+    venv_store = env_path / "venvs"
+    repos_path.mkdir(parents=True, exist_ok=True)
+    cache_path.mkdir(parents=True, exist_ok=True)
+
+    base_env = _env_with_uv(env_path)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(repos) or 1))) as pool:
+        futures = {
+            pool.submit(_setup_repo, repo, repos_path, cache_path, venv_store, base_env): repo
+            for repo in repos
+        }
+        errors = []
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except subprocess.CalledProcessError as e:
+                repo = futures[future]
+                detail = (e.stderr or "").strip().splitlines()
+                console.print(f"  [red]Setup failed for {repo.name}: {detail[-1] if detail else e}[/red]")
+                errors.append(e)
+
+    if errors:
+        raise errors[0]
@@ -0,0 +1,195 @@
+"""CPU and memory accounting for raw commands run on the parent node."""
+
+import os
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+# Seconds between samples of a raw command's memory use.
+SAMPLE_INTERVAL = 0.5
+
+
+def available_cpus() -> List[int]:
+    """The cores this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def total_memory_gb() -> Optional[float]:
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) / 1024**2
+    except OSError:
+        pass
+    return None
+
+
+def _scan_groups(pgids: Set[int]) -> Dict[int, List[int]]:
+    """Member pids of each of the given process groups, from /proc."""
+    members: Dict[int, List[int]] = {pgid: [] for pgid in pgids}
+    try:
+        pids = [p for p in os.listdir("/proc") if p.isdigit()]
+    except OSError:
+        return members
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # Fields after the parenthesised command name: state, ppid, pgrp, ...
+        pgrp = int(stat[stat.rfind(b")") + 2 :].split()[2])
+        if pgrp in members:
+            members[pgrp].append(int(pid))
+    return members
+
+
+def _memory(pid: int) -> Tuple[int, int]:
+    """(current, peak) resident bytes of one process; zeros once it has exited."""
+    rss = hwm = 0
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1]) * 1024
+                elif line.startswith("VmHWM:"):
+                    hwm = int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return rss, hwm
+
+
+class _Watch:
+    __slots__ = ("cores", "pinned", "peak")
+
+    def __init__(self, cores: Optional[List[int]]):
+        self.cores = cores
+        self.pinned: Set[int] = set()
+        self.peak = 0
+
+
+class LocalPool:
+    """Admit raw commands by their declared `cpus` and `memory_gb`, and measure what they use.
+
+    `try_acquire` is called by the scheduler only (it never blocks); a task
+    that doesn't fit waits in the scheduler's queue. A task asking for more
+    than the whole pool is admitted once the pool is idle, so it can't wait
+    forever. With `pin`, each task gets its own set of cores, applied to every
+    process in its process group. Each command's process group is sampled from
+    /proc for its peak resident memory (summed over the group).
+    """
+
+    def __init__(
+        self,
+        cpus: Optional[int] = None,
+        memory_gb: Optional[float] = None,
+        pin: bool = False,
+    ):
+        cores = available_cpus()
+        self.cpus = cpus or len(cores)
+        if pin:
+            # Pinned tasks get cores of their own, so there can't be more CPUs than cores.
+            self.cpus = min(self.cpus, len(cores))
+        self.memory_gb = memory_gb if memory_gb is not None else total_memory_gb()
+        self.pin = pin
+        self._free_cores = cores[: self.cpus] if pin else []
+        self._used_cpus = 0
+        self._used_memory = 0.0
+        self._tasks = 0
+        self._lock = threading.Lock()
+        self._watches: Dict[int, _Watch] = {}
+        self._sampler: Optional[threading.Thread] = None
+        self._wake = threading.Event()
+
+    # ── Admission (scheduler thread) ───────────────────────────────────
+
+    def _request(self, task) -> Tuple[int, float]:
+        cpus = min(task.command.cpus, self.cpus)
+        memory = task.command.memory_gb or 0.0
+        if self.memory_gb is not None:
+            memory = min(memory, self.memory_gb)
+        return cpus, memory
+
+    @property
+    def has_room(self) -> bool:
+        return self._used_cpus < self.cpus
+
+    def try_acquire(self, task) -> bool:
+        cpus, memory = self._request(task)
+        if self._tasks and (
+            self._used_cpus + cpus > self.cpus
+            or (self.memory_gb is not None and self._used_memory + memory > self.memory_gb)
+        ):
+            return False
+        self._used_cpus += cpus
+        self._used_memory += memory
+        self._tasks += 1
+        if self.pin:
+            task.cores, self._free_cores = self._free_cores[:cpus], self._free_cores[cpus:]
+        return True
+
+    def release(self, task):
+        cpus, memory = self._request(task)
+        self._used_cpus -= cpus
+        self._used_memory -= memory
+        self._tasks -= 1
+        if task.cores:
+            self._free_cores = sorted(self._free_cores + task.cores)
+            task.cores = None
+
+    # ── Monitoring (task threads) ──────────────────────────────────────
+
+    def watch(self, pgid: int, cores: Optional[List[int]] = None):
+        """Start sampling the process group led by `pgid`, pinning it to `cores` if given."""
+        watch = _Watch(cores)
+        if cores:
+            self._pin(pgid, watch)
+        with self._lock:
+            self._watches[pgid] = watch
+            if self._sampler is None:
+                self._sampler = threading.Thread(
+                    target=self._sample_loop, name="bipelines-local-pool", daemon=True
+                )
+                self._sampler.start()
+        self._wake.set()
+
+    def unwatch(self, pgid: int) -> Optional[int]:
+        """Stop sampling `pgid`. Returns its peak resident bytes (None if never measured)."""
+        with self._lock:
+            watch = self._watches.pop(pgid, None)
+        if watch is None or not watch.peak:
+            return None
+        return watch.peak
+
+    def _pin(self, pid: int, watch: _Watch):
+        try:
+            os.sched_setaffinity(pid, watch.cores)
+            watch.pinned.add(pid)
+        except (AttributeError, OSError):
+            pass
+
+    def _sample_loop(self):
+        while True:
+            self._wake.wait(SAMPLE_INTERVAL)
+            self._wake.clear()
+            with self._lock:
+                watches = dict(self._watches)
+            if not watches:
+                continue
+            members = _scan_groups(set(watches))
+            for pgid, watch in watches.items():
+                usage = [_memory(pid) for pid in members[pgid]]
+                # The group's summed RSS now, or the biggest single process's own peak.
+                watch.peak = max(
+                    watch.peak,
+                    sum(rss for rss, _ in usage),
+                    max((hwm for _, hwm in usage), default=0),
+                )
+                # Children forked after the leader was pinned inherit its affinity,
+                # but anything that slipped through before that is pinned here.
+                if watch.cores:
+                    for pid in members[pgid]:
+                        if pid not in watch.pinned:
+                            self._pin(pid, watch)
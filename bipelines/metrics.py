@@ -0,0 +1,346 @@
+import json
+import os
+import threading
+import time
+import types
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from bipelines.ratelimit import RetryPolicy, TokenBucket
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit.
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Client services whose calls are instrumented, and client methods that make no RPC.
+_SERVICES = ("workload", "job", "experiment", "workspace")
+_LOCAL_METHODS = {"url"}
+
+# Items per page of a paginated listing (beaker-py's MAX_PAGE_SIZE); each page is one RPC.
+_PAGE_SIZE = 50
+
+
+@dataclass
+class _MethodStats:
+    count: int = 0
+    errors: int = 0
+    retries: int = 0
+    throttled: float = 0.0
+    total: float = 0.0
+    max: float = 0.0
+    buckets: List[int] = field(default_factory=lambda: [0] * len(LATENCY_BUCKETS))
+
+    def observe(self, seconds: float, error: bool):
+        self.count += 1
+        self.errors += error
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+
+
+class ApiMetrics:
+    """Per-method call counts, error counts and latency histograms for Beaker RPCs.
+
+    Thread-safe; written out as JSON and as a Prometheus textfile (for the
+    node_exporter textfile collector).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._methods: Dict[str, _MethodStats] = {}
+        self.started = time.time()
+
+    def observe(self, method: str, seconds: float, error: bool = False):
+        with self._lock:
+            self._stats(method).observe(seconds, error)
+
+    def observe_retry(self, method: str):
+        with self._lock:
+            self._stats(method).retries += 1
+
+    def observe_throttle(self, method: str, seconds: float):
+        with self._lock:
+            self._stats(method).throttled += seconds
+
+    def _stats(self, method: str) -> _MethodStats:
+        stats = self._methods.get(method)
+        if stats is None:
+            stats = self._methods[method] = _MethodStats()
+        return stats
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            methods = {
+                name: {
+                    "count": s.count,
+                    "errors": s.errors,
+                    "retries": s.retries,
+                    "throttled_s": round(s.throttled, 6),
+                    "total_s": round(s.total, 6),
+                    "mean_s": round(s.total / s.count, 6) if s.count else 0.0,
+                    "max_s": round(s.max, 6),
+                    "buckets": dict(zip((str(b) for b in LATENCY_BUCKETS), s.buckets)),
+                }
+                for name, s in sorted(self._methods.items())
+            }
+        return {
+            "started": self.started,
+            "written": time.time(),
+            "calls": sum(m["count"] for m in methods.values()),
+            "errors": sum(m["errors"] for m in methods.values()),
+            "retries": sum(m["retries"] for m in methods.values()),
+            "throttled_s": round(sum(m["throttled_s"] for m in methods.values()), 6),
+            "methods": methods,
+        }
+
+    def to_prometheus(self) -> str:
+        with self._lock:
+            methods = sorted(self._methods.items())
+            lines = [
+                "# HELP bipelines_beaker_requests_total Beaker API calls by method.",
+                "# TYPE bipelines_beaker_requests_total counter",
+            ]
+            lines += [f'bipelines_beaker_requests_total{{method="{m}"}} {s.count}' for m, s in methods]
+            lines += [
+                "# HELP bipelines_beaker_request_errors_total Beaker API calls that raised.",
+                "# TYPE bipelines_beaker_request_errors_total counter",
+            ]
+            lines += [
+                f'bipelines_beaker_request_errors_total{{method="{m}"}} {s.errors}' for m, s in methods
+            ]
+            lines += [
+                "# HELP bipelines_beaker_request_retries_total Beaker API calls retried after a transient error.",
+                "# TYPE bipelines_beaker_request_retries_total counter",
+            ]
+            lines += [
+                f'bipelines_beaker_request_retries_total{{method="{m}"}} {s.retries}' for m, s in methods
+            ]
+            lines += [
+                "# HELP bipelines_beaker_throttled_seconds_total Time spent waiting on the client-side rate limiter.",
+                "# TYPE bipelines_beaker_throttled_seconds_total counter",
+            ]
+            lines += [
+                f'bipelines_beaker_throttled_seconds_total{{method="{m}"}} {s.throttled:.6f}'
+                for m, s in methods
+            ]
+            lines += [
+                "# HELP bipelines_beaker_request_duration_seconds Beaker API call latency.",
+                "# TYPE bipelines_beaker_request_duration_seconds histogram",
+            ]
+            for m, s in methods:
+                cumulative = 0
+                for bound, n in zip(LATENCY_BUCKETS, s.buckets):
+                    cumulative += n
+                    lines.append(
+                        f'bipelines_beaker_request_duration_seconds_bucket{{method="{m}",le="{bound}"}} {cumulative}'
+                    )
+                lines.append(
+                    f'bipelines_beaker_request_duration_seconds_bucket{{method="{m}",le="+Inf"}} {s.count}'
+                )
+                lines.append(f'bipelines_beaker_request_duration_seconds_sum{{method="{m}"}} {s.total:.6f}')
+                lines.append(f'bipelines_beaker_request_duration_seconds_count{{method="{m}"}} {s.count}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory: Path, stem: str):
+        """Write `<stem>.json` and `<stem>.prom` into `directory`, atomically."""
+        directory.mkdir(parents=True, exist_ok=True)
+        _write_atomic(directory / f"{stem}.json", json.dumps(self.snapshot(), indent=2))
+        _write_atomic(directory / f"{stem}.prom", self.to_prometheus())
+
+    def write_every(self, directory: Path, stem: str, interval: float) -> threading.Event:
+        """Rewrite the metrics files every `interval` seconds until the returned event is set."""
+        stop = threading.Event()
+
+        def loop():
+            while not stop.wait(interval):
+                try:
+                    self.write(directory, stem)
+                except OSError:
+                    pass
+
+        threading.Thread(target=loop, name="bipelines-metrics", daemon=True).start()
+        return stop
+
+
+def _write_atomic(path: Path, text: str):
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+
+
+class _InstrumentedService:
+    """Proxy for a client service (e.g. `beaker.workload`) that times every RPC method.
+
+    Each call first takes a token from the shared `limiter`, and calls that
+    fail with a retryable error are retried according to `retry`.
+    """
+
+    def __init__(
+        self,
+        service,
+        name: str,
+        metrics: ApiMetrics,
+        limiter: Optional[TokenBucket] = None,
+        retry: Optional[RetryPolicy] = None,
+    ):
+        self._service = service
+        self._name = name
+        self._metrics = metrics
+        self._limiter = limiter
+        self._retry = retry
+
+    def _throttle(self, method: str):
+        if self._limiter is not None:
+            waited = self._limiter.acquire()
+            if waited:
+                self._metrics.observe_throttle(method, waited)
+
+    def _backoff(self, method: str, error: Exception, attempt: int) -> bool:
+        """Sleep before another attempt if `error` is worth retrying; False to give up."""
+        if self._retry is None or not self._retry.should_retry(error, attempt):
+            return False
+        self._metrics.observe_retry(method)
+        time.sleep(self._retry.delay(attempt))
+        return True
+
+    def __getattr__(self, attr: str):
+        value = getattr(self._service, attr)
+        if attr.startswith("_") or attr in _LOCAL_METHODS or not callable(value):
+            return value
+        method = f"{self._name}.{attr}"
+        metrics = self._metrics
+
+        def call(*args, **kwargs):
+            attempt = 0
+            while True:
+                self._throttle(method)
+                started = time.perf_counter()
+                try:
+                    result = value(*args, **kwargs)
+                    if isinstance(result, types.GeneratorType):
+                        return self._timed_iter(
+                            result, method, time.perf_counter() - started,
+                            restart=lambda: value(*args, **kwargs),
+                        )
+                except Exception as e:
+                    metrics.observe(method, time.perf_counter() - started, error=True)
+                    if self._backoff(method, e, attempt):
+                        attempt += 1
+                        continue
+                    raise
+                metrics.observe(method, time.perf_counter() - started)
+                return result
+
+        return call
+
+    def _timed_iter(self, gen, method: str, elapsed: float, restart: Callable[[], Any]):
+        """Yield from a paginated listing, counting only the time spent fetching, not consuming.
+
+        Each page is recorded as one call, and every page after the first
+        takes another limiter token. A listing that fails before yielding
+        anything is restarted like any other call; one that fails partway
+        through raises, since retrying would repeat items.
+        """
+        error = False
+        attempt = 0
+        yielded = 0
+        try:
+            while True:
+                if yielded and yielded % _PAGE_SIZE == 0:
+                    # The previous page is complete; the next item starts a new RPC.
+                    self._metrics.observe(method, elapsed)
+                    elapsed = 0.0
+                    self._throttle(method)
+                started = time.perf_counter()
+                try:
+                    item = next(gen)
+                except StopIteration:
+                    elapsed += time.perf_counter() - started
+                    return
+                except Exception as e:
+                    elapsed += time.perf_counter() - started
+                    if not yielded and self._backoff(method, e, attempt):
+                        self._metrics.observe(method, elapsed, error=True)
+                        elapsed = 0.0
+                        attempt += 1
+                        self._throttle(method)
+                        gen = restart()
+                        continue
+                    error = True
+                    raise
+                elapsed += time.perf_counter() - started
+                yielded += 1
+                yield item
+        finally:
+            gen.close()
+            self._metrics.observe(method, elapsed, error=error)
+
+
+def _disable_client_retries(client, service):
+    """Turn off beaker-py's own retries, so every attempt is throttled, counted and retried here.
+
+    The client retries Get/List/Resolve RPCs itself: up to `MAX_RETRIES`
+    times on server errors, and without limit while the server is
+    unavailable, none of it visible to the limiter. Test doubles have
+    neither hook and are left alone.
+    """
+    if hasattr(type(client), "MAX_RETRIES"):
+        client.MAX_RETRIES = 0
+    if callable(getattr(service, "_retriable", None)):
+        service._retriable = lambda *args, **kwargs: (lambda method: method)
+
+
+class InstrumentedBeaker:
+    """Wrap a Beaker client so every service call is recorded in `metrics`.
+
+    Everything else (config, services that aren't instrumented, attributes of
+    test doubles) passes straight through to the wrapped client. Pass
+    `factory` instead of `beaker` to defer creating the client until it is
+    first used, so runs that never talk to Beaker don't need credentials.
+    Every call shares one `limiter` and `retry` policy, whichever thread
+    (poller, task workers, cache build) makes it. With a `retry` policy the
+    client's own retries are turned off, so it is the only one.
+    """
+
+    def __init__(
+        self,
+        beaker: Any = None,
+        metrics: Optional[ApiMetrics] = None,
+        factory: Optional[Callable[[], Any]] = None,
+        limiter: Optional[TokenBucket] = None,
+        retry: Optional[RetryPolicy] = None,
+    ):
+        self._beaker = beaker
+        self._factory = factory
+        self.limiter = limiter
+        self.retry = retry
+        self._lock = threading.Lock()
+        self.metrics = metrics if metrics is not None else ApiMetrics()
+        self._services: Dict[str, _InstrumentedService] = {}
+
+    @property
+    def unwrapped(self):
+        if self._beaker is None:
+            with self._lock:
+                if self._beaker is None:
+                    self._beaker = self._factory()
+        return self._beaker
+
+    def __getattr__(self, attr: str):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        if attr in _SERVICES:
+            service = self._services.get(attr)
+            if service is None:
+                client = self.unwrapped
+                inner = getattr(client, attr)
+                if self.retry is not None:
+                    _disable_client_retries(client, inner)
+                service = self._services[attr] = _InstrumentedService(
+                    inner, attr, self.metrics, self.limiter, self.retry
+                )
+            return service
+        return getattr(self.unwrapped, attr)
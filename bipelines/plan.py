@@ -0,0 +1,95 @@
+"""Offline preview of a run: task hashes and their last known status, from local state only.
+
+Deliberately imports neither beaker nor rich, so it starts fast and works
+without Beaker credentials (e.g. from pre-commit or CI on every config edit).
+"""
+
+import shutil
+import sqlite3
+import sys
+from typing import Dict, List, TextIO
+
+from bipelines.config import BipelineConfig
+from bipelines.index import DedupIndex, IndexEntry
+from bipelines.journal import RunJournal
+
+
+def _known_entries(
+    config: BipelineConfig, hashes: List[str], commits: Dict[str, str]
+) -> Dict[str, IndexEntry]:
+    """What the on-disk dedup index and this run's journal say about `hashes`."""
+    known: Dict[str, IndexEntry] = {}
+    if config.workspace and config.index_path.exists():
+        index = None
+        try:
+            index = DedupIndex(config.index_path, config.workspace, readonly=True)
+            known.update(index.get_many(hashes))
+        except sqlite3.Error:
+            pass
+        finally:
+            if index is not None:
+                index.close()
+    if config.journal_path is not None:
+        raw = {config.task_hash(c, commits) for c in config.iter_commands() if c.raw}
+        known.update(
+            (h, e) for h, e in RunJournal(config.journal_path).replay().items() if h not in raw
+        )
+    return known
+
+
+def plan(config: BipelineConfig) -> List[dict]:
+    """One dict per command: index, name, hash, command, raw, after, status, provisional."""
+    # Content keys use the commits of any repos already cloned into local_env_dir.
+    commits = config.resolved_commits() if config.dedup_key == "content" else {}
+    hashes = [config.task_hash(c, commits) for c in config.iter_commands()]
+    known = _known_entries(config, hashes, commits)
+    rows = []
+    for i, (cmd, task_hash) in enumerate(zip(config.iter_commands(), hashes)):
+        entry = None if cmd.raw else known.get(task_hash)
+        rows.append(
+            {
+                "index": i + 1,
+                "name": cmd.name,
+                "hash": task_hash,
+                "command": cmd.command,
+                "raw": cmd.raw,
+                "after": cmd.after or [],
+                "status": entry.status if entry is not None else ("raw" if cmd.raw else "new"),
+                "experiment_id": entry.experiment_id if entry is not None else None,
+                "provisional": config.hash_is_provisional(cmd, commits),
+            }
+        )
+    return rows
+
+
+def print_plan(config: BipelineConfig, out: TextIO = sys.stdout) -> List[dict]:
+    """Print the plan as a plain-text table followed by a status summary."""
+    rows = plan(config)
+    labels = [r["name"] or str(r["index"]) for r in rows]
+    label_width = max([4, *map(len, labels)])
+    width = shutil.get_terminal_size((120, 24)).columns
+    command_width = max(20, width - label_width - 14 - 12 - 6)
+
+    out.write(f"Run hash:   {config.run_hash or '(none)'}\n")
+    out.write(f"Workspace:  {config.workspace or '(none — dedup disabled)'}\n")
+    out.write(f"Commands:   {len(rows)}\n\n")
+    out.write(f"{'#':<{label_width}}  {'Hash':<14}  {'Status':<12}  Command\n")
+    for label, r in zip(labels, rows):
+        command = r["command"]
+        if r["after"]:
+            command += f"  (after {', '.join(r['after'])})"
+        if len(command) > command_width:
+            command = command[: command_width - 3] + "..."
+        task_hash = r["hash"] + ("*" if r["provisional"] else "")
+        out.write(f"{label:<{label_width}}  {task_hash:<14}  {r['status']:<12}  {command}\n")
+
+    counts: Dict[str, int] = {}
+    for r in rows:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    out.write("\n" + ", ".join(f"{n} {status}" for status, n in sorted(counts.items())) + "\n")
+    if any(r["provisional"] for r in rows):
+        out.write(
+            "* provisional: keyed on a branch name; the run hashes the commit it resolves to "
+            "(pin `commit` or set up the repo first)\n"
+        )
+    return rows
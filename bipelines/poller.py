@@ -0,0 +1,212 @@
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from beaker import Beaker
+from beaker.exceptions import BeakerNotFoundError
+from rich.console import Console
+
+from bipelines.experiment import WORKLOAD_STATUS_DISPLAY, get_experiment_state
+
+console = Console()
+
+# Consecutive failed status lookups before a watched experiment is given up on.
+MAX_LOOKUP_FAILURES = 5
+
+# Pages of the workspace listing read per tick (50 workloads each); the rest are looked up by id.
+MAX_LIST_PAGES = 5
+_PAGE_SIZE = 50
+
+
+def sprint(*args, **kwargs):
+    try:
+        console.print(*args, **kwargs)
+    except Exception:
+        plain = " ".join(str(a) for a in args)
+        print(plain)
+
+
+@dataclass
+class _Watch:
+    created: datetime
+    status: Optional[str] = None
+    description: Optional[str] = None
+    tick: int = 0
+    failures: int = 0
+    error: Optional[Exception] = None
+
+
+class StatusPoller:
+    """Track every in-flight experiment and refresh them together once per tick.
+
+    Each tick lists the workspace's workloads created since the oldest watched
+    experiment (one paginated `workload.list`, stopping as soon as every watched
+    id has been seen), so the number of API calls stays flat as more tasks wait.
+    `name_or_description` narrows the listing to our own tagged workloads, so
+    other users' churn in a shared workspace doesn't add pages, and at most
+    `max_pages` pages are read per tick. Experiments the listing doesn't
+    reach (untagged, past the page cap, created more than `max_lookback`
+    ago, or no workspace configured) fall back to a per-experiment status
+    lookup. `workspace` is a name or an already resolved workspace.
+
+    Waiting tasks block in `wait()` until the next tick that refreshed their
+    experiment and receive its latest status. The experiment's description
+    comes along for free and is available from `description()`. An experiment
+    that can't be found, or whose lookup fails `MAX_LOOKUP_FAILURES` ticks in
+    a row, makes `wait()` raise the last error instead of blocking forever.
+    """
+
+    def __init__(
+        self,
+        beaker: Beaker,
+        workspace: Any = None,
+        interval: float = 15.0,
+        min_interval: float = 1.0,
+        max_lookback: timedelta = timedelta(days=1),
+        name_or_description: Optional[str] = None,
+        max_pages: int = MAX_LIST_PAGES,
+    ):
+        self.beaker = beaker
+        self.workspace = workspace
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_lookback = max_lookback
+        self.name_or_description = name_or_description
+        self.max_pages = max_pages
+
+        self._cond = threading.Condition()
+        self._watched: Dict[str, _Watch] = {}
+        self._tick = 0
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ── Watch registry ──────────────────────────────────────────────────
+
+    def watch(self, experiment_id: str, created: Optional[datetime] = None):
+        """Start tracking an experiment; the next tick picks it up."""
+        with self._cond:
+            if experiment_id not in self._watched:
+                self._watched[experiment_id] = _Watch(
+                    created=created or datetime.now(timezone.utc)
+                )
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="bipelines-poller", daemon=True
+                )
+                self._thread.start()
+        self._wake.set()
+
+    def unwatch(self, experiment_id: str):
+        with self._cond:
+            self._watched.pop(experiment_id, None)
+
+    def wait(self, experiment_id: str, after_tick: int = 0) -> Tuple[str, int]:
+        """Block until the experiment is refreshed by a tick later than `after_tick`.
+
+        Returns (status, tick). Pass the returned tick back in to wait for the next one.
+        Raises the lookup error once the experiment has been given up on.
+        """
+        with self._cond:
+            while True:
+                w = self._watched.get(experiment_id)
+                if w is None:
+                    raise KeyError(f"Experiment {experiment_id} is not being watched")
+                if w.error is not None:
+                    raise w.error
+                if w.tick > after_tick and w.status is not None:
+                    return w.status, w.tick
+                if self._stopped.is_set():
+                    raise RuntimeError("Status poller has been stopped")
+                # Timed, so a waiter never outlives the poller by more than a tick.
+                self._cond.wait(self.interval)
+
+    def description(self, experiment_id: str) -> Optional[str]:
+        """The description seen by the latest tick, or None if it hasn't been seen yet."""
+        with self._cond:
+            w = self._watched.get(experiment_id)
+            return w.description if w is not None else None
+
+    def stop(self):
+        """Stop polling; every task blocked in `wait()` raises instead."""
+        self._stopped.set()
+        self._wake.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    # ── Polling ─────────────────────────────────────────────────────────
+
+    def refresh(self):
+        """Refresh every watched experiment once and wake up the waiting tasks."""
+        with self._cond:
+            watched = {k: v.created for k, v in self._watched.items()}
+        if not watched:
+            return
+
+        updates: Dict[str, Tuple[str, str]] = {}
+        errors: Dict[str, Exception] = {}
+        now = datetime.now(timezone.utc)
+        listable = {k: c for k, c in watched.items() if now - c <= self.max_lookback}
+
+        if self.workspace and listable:
+            # Beaker's created timestamps and ours come from different clocks.
+            created_after = min(listable.values()) - timedelta(minutes=5)
+            try:
+                for i, w in enumerate(self.beaker.workload.list(
+                    workspace=self.workspace,
+                    created_after=created_after,
+                    name_or_description=self.name_or_description,
+                )):
+                    if i >= self.max_pages * _PAGE_SIZE:
+                        break
+                    exp_id = w.experiment.id
+                    if exp_id in listable:
+                        updates[exp_id] = (
+                            WORKLOAD_STATUS_DISPLAY.get(w.status, "unknown"),
+                            w.experiment.description or "",
+                        )
+                        if len(updates) == len(listable):
+                            break
+            except Exception as e:
+                sprint(f"  [dim]Warning: could not list workloads: {e}[/dim]")
+
+        for exp_id in watched:
+            if exp_id in updates:
+                continue
+            try:
+                updates[exp_id] = get_experiment_state(self.beaker, exp_id)
+            except Exception as e:
+                errors[exp_id] = e
+                sprint(f"  [dim]Warning: could not get status of {exp_id}: {e}[/dim]")
+
+        with self._cond:
+            self._tick += 1
+            for exp_id, (status, description) in updates.items():
+                w = self._watched.get(exp_id)
+                if w is None:
+                    continue
+                w.status = status
+                w.description = description
+                w.tick = self._tick
+                w.failures = 0
+            for exp_id, error in errors.items():
+                w = self._watched.get(exp_id)
+                if w is None:
+                    continue
+                w.failures += 1
+                if isinstance(error, BeakerNotFoundError) or w.failures >= MAX_LOOKUP_FAILURES:
+                    w.error = error
+            self._cond.notify_all()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            started = time.monotonic()
+            self.refresh()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            # Coalesce bursts of watch() calls into a single refresh.
+            remaining = self.min_interval - (time.monotonic() - started)
+            if remaining > 0:
+                self._stopped.wait(remaining)
@@ -0,0 +1,71 @@
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+# gRPC status codes worth retrying: throttling and transient server trouble.
+_RETRYABLE_GRPC_CODES = {"RESOURCE_EXHAUSTED", "UNAVAILABLE", "DEADLINE_EXCEEDED", "INTERNAL", "ABORTED"}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: on average `rate` acquisitions per second, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until it is available. Returns the time spent waiting."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Reserve the token now (possibly going negative) so waiters queue up fairly.
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether a failed Beaker call is worth retrying: HTTP 429/5xx, gRPC throttling or outages."""
+    from beaker.exceptions import BeakerError, BeakerServerError
+
+    if isinstance(error, BeakerServerError):
+        return True
+    if isinstance(error, BeakerError):
+        return str(error).startswith("[code=429]")
+
+    code = getattr(error, "code", None)
+    if callable(code):
+        try:
+            return getattr(code(), "name", None) in _RETRYABLE_GRPC_CODES
+        except Exception:
+            return False
+
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    # Connection resets, timeouts and the like (requests' errors are OSErrors too).
+    return isinstance(error, OSError)
+
+
+@dataclass
+class RetryPolicy:
+    """Retry retryable errors up to `attempts` times in total, with full-jitter exponential backoff."""
+
+    attempts: int = 5
+    base: float = 0.5
+    cap: float = 30.0
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to sleep after failed attempt number `attempt` (0-based)."""
+        return random.uniform(0, min(self.cap, self.base * 2**attempt))
+
+    def should_retry(self, error: BaseException, attempt: int) -> bool:
+        return attempt + 1 < self.attempts and is_retryable(error)
@@ -0,0 +1,206 @@
+import asyncio
+import os
+import signal
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from concurrent.futures import Future
+from typing import Callable, Coroutine, Deque, Optional, Set, TypeVar
+
+T = TypeVar("T")
+
+# Launchers (gantry with show_logs) can print very long lines.
+_STREAM_LIMIT = 16 * 1024 * 1024
+
+
+@dataclass
+class CommandResult:
+    returncode: int
+    timed_out: bool = False
+
+
+class AsyncCommandRunner:
+    """Run many shell commands concurrently on a single asyncio event loop.
+
+    The loop lives on one background thread, so any number of launcher
+    processes make progress at once without a reader thread per process.
+    Output lines are appended to an optional log file, kept in an optional
+    bounded `tail` buffer, echoed with a per-task prefix if `echo` is set, and
+    handed to `on_line` as they arrive; `on_start` gets the pid as soon as the
+    process exists. Scheduler worker threads call `run()`,
+    which blocks only on the result.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._in_flight: Set[Future] = set()
+        # Process groups of the commands running now.
+        self._groups: Set[int] = set()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="bipelines-runner", daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    def submit(self, coro: Coroutine[None, None, T]) -> T:
+        """Run a coroutine on the runner's loop and block until it finishes."""
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        with self._lock:
+            self._in_flight.add(future)
+        try:
+            return future.result()
+        finally:
+            with self._lock:
+                self._in_flight.discard(future)
+
+    def cancel_all(self):
+        """Cancel every command in flight, killing its process group.
+
+        The groups are killed from the calling thread, so they are gone even if
+        the process exits before the loop gets to the cancellation. The
+        callers blocked in `run()` raise CancelledError right away.
+        """
+        with self._lock:
+            in_flight = list(self._in_flight)
+            groups = list(self._groups)
+        for pid in groups:
+            _kill_group(pid)
+        for future in in_flight:
+            future.cancel()
+
+    def run(
+        self,
+        command: str,
+        env: Optional[dict] = None,
+        cwd: Optional[str] = None,
+        prefix: str = "",
+        timeout: Optional[float] = None,
+        on_line: Optional[Callable[[str], None]] = None,
+        log_path: Optional[Path] = None,
+        tail: Optional[Deque[str]] = None,
+        echo: bool = True,
+        on_start: Optional[Callable[[int], None]] = None,
+    ) -> CommandResult:
+        return self.submit(
+            self.run_async(
+                command, env, cwd, prefix, timeout, on_line, log_path, tail, echo, on_start
+            )
+        )
+
+    async def run_async(
+        self,
+        command: str,
+        env: Optional[dict] = None,
+        cwd: Optional[str] = None,
+        prefix: str = "",
+        timeout: Optional[float] = None,
+        on_line: Optional[Callable[[str], None]] = None,
+        log_path: Optional[Path] = None,
+        tail: Optional[Deque[str]] = None,
+        echo: bool = True,
+        on_start: Optional[Callable[[int], None]] = None,
+    ) -> CommandResult:
+        log = None
+        if log_path is not None:
+            log_path.parent.mkdir(parents=True, exist_ok=True)
+            log = open(log_path, "a", errors="replace")
+            log.write(f"$ {command}\n")
+
+        try:
+            proc = await asyncio.create_subprocess_shell(
+                command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                env=env,
+                cwd=cwd,
+                limit=_STREAM_LIMIT,
+                # Own process group, so a timeout kills the launcher's children too.
+                start_new_session=True,
+            )
+        except BaseException:
+            if log is not None:
+                log.close()
+            raise
+        with self._lock:
+            self._groups.add(proc.pid)
+        if on_start is not None:
+            # The pid is also the process group id (start_new_session).
+            on_start(proc.pid)
+
+        async def pump():
+            while True:
+                raw = await proc.stdout.readline()
+                if not raw:
+                    break
+                line = raw.decode(errors="replace").rstrip("\n")
+                if log is not None:
+                    log.write(line + "\n")
+                if tail is not None:
+                    tail.append(line)
+                if echo:
+                    print(f"  {prefix}{line}", flush=True)
+                if on_line is not None:
+                    on_line(line)
+            return await proc.wait()
+
+        try:
+            returncode = await asyncio.wait_for(pump(), timeout)
+        except asyncio.TimeoutError:
+            _kill_group(proc.pid)
+            await proc.wait()
+            return CommandResult(returncode=proc.returncode, timed_out=True)
+        except asyncio.CancelledError:
+            _kill_group(proc.pid)
+            raise
+        except ValueError:
+            # A single output line longer than _STREAM_LIMIT: the command counts as failed.
+            _kill_group(proc.pid)
+            await proc.wait()
+            message = f"[bipelines] output line longer than {_STREAM_LIMIT} bytes; command killed"
+            if log is not None:
+                log.write(message + "\n")
+            if tail is not None:
+                tail.append(message)
+            return CommandResult(returncode=proc.returncode or 1)
+        finally:
+            with self._lock:
+                self._groups.discard(proc.pid)
+            if log is not None:
+                log.close()
+        return CommandResult(returncode=returncode)
+
+    def close(self):
+        with self._lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join()
+                self._loop.close()
+                self._loop = None
+                self._thread = None
+
+
+def _kill_group(pid: int):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+_default_runner: Optional[AsyncCommandRunner] = None
+_default_runner_lock = threading.Lock()
+
+
+def get_runner() -> AsyncCommandRunner:
+    """The process-wide runner shared by every launcher and raw command."""
+    global _default_runner
+    with _default_runner_lock:
+        if _default_runner is None:
+            _default_runner = AsyncCommandRunner()
+        return _default_runner
@@ -0,0 +1,266 @@
+import heapq
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Tuple
+
+from bipelines.config import CommandConfig
+from bipelines.status import FAILED_STATUSES, SATISFIED_STATUSES, TERMINAL_STATUSES
+
+if TYPE_CHECKING:
+    from bipelines.localpool import LocalPool
+
+# Tasks pulled ahead of the ones running while they wait on dependencies or limits.
+LOOKAHEAD = 1000
+
+
+@dataclass
+class Task:
+    """One command in the pipeline, with its position in the dependency graph."""
+
+    index: int
+    command: CommandConfig
+    hash: str
+    deps: List[int] = field(default_factory=list)
+    status: Optional[str] = None
+    # The experiment the current attempt launched or followed, and one record per attempt.
+    experiment_id: Optional[str] = None
+    attempts: List[dict] = field(default_factory=list)
+    # Cores reserved for a raw command by a pinning LocalPool, and what its last attempt used.
+    cores: Optional[List[int]] = None
+    process: Optional[dict] = None
+    # Launched by another shard; this parent only follows its experiment.
+    follow: bool = False
+    # Set by run_task to have the task run again once time.monotonic() reaches it.
+    not_before: Optional[float] = None
+
+    @property
+    def label(self) -> str:
+        return self.command.name or str(self.index + 1)
+
+
+def limit_keys(cmd: CommandConfig) -> List[str]:
+    """The `limits` keys a command counts against: its cluster, budget and labels."""
+    keys = []
+    if cmd.cluster:
+        keys.append(f"cluster:{cmd.cluster}")
+    if cmd.budget:
+        keys.append(f"budget:{cmd.budget}")
+    keys += [f"label:{label}" for label in cmd.labels or []]
+    return keys
+
+
+class InFlightLimits:
+    """Per-key counts of running tasks, each capped by its entry in `limits`.
+
+    Tasks another shard launches (`follow`) don't count: the owner holds their slots.
+    """
+
+    def __init__(self, limits: Dict[str, int]):
+        self.limits = limits
+        self.in_flight: Counter = Counter()
+
+    def _keys(self, task: Task) -> List[str]:
+        if task.follow:
+            return []
+        return [k for k in limit_keys(task.command) if k in self.limits]
+
+    def try_acquire(self, task: Task) -> bool:
+        keys = self._keys(task)
+        if any(self.in_flight[k] >= self.limits[k] for k in keys):
+            return False
+        for k in keys:
+            self.in_flight[k] += 1
+        return True
+
+    def release(self, task: Task):
+        for k in self._keys(task):
+            self.in_flight[k] -= 1
+
+
+class DagScheduler:
+    """Run tasks concurrently in dependency order, at most `max_parallel` at a time.
+
+    Ready tasks are launched in config order, so with `max_parallel=1` and no
+    dependencies this is the same strictly sequential run as before. When a task
+    fails or is canceled, nothing new is launched: tasks already in flight are
+    waited on, and everything that never started (including the failed task's
+    downstream) ends up `skipped`.
+
+    `tasks` may be a lazy iterable (e.g. a large sweep): tasks are only pulled
+    from it while there is a free slot, so a run holds the tasks it has started
+    or is blocked on rather than building the whole list up front. `tasks`
+    ends up holding every task, in order, once `run` returns. Tasks that
+    arrive with a status already set are recorded as they are and never run.
+
+    `limits` caps how many running tasks may share a cluster, budget or label
+    (see `limit_keys`). A task over its cap waits locally, without taking a
+    worker, while tasks behind it that are under their caps start; at most
+    `lookahead` waiting tasks are held at once.
+
+    With `on_failure="continue"`, a failed task doesn't stop the run: only
+    the tasks downstream of it are skipped.
+
+    A `run_task` that sets `task.not_before` before returning asks for the
+    task to be run again from then (a retry with backoff). The task gives up
+    its slot and limits while it waits. If the run aborts in the meantime,
+    the task keeps the status that attempt returned.
+
+    With a `local_pool`, raw commands don't take `max_parallel` slots: they
+    run alongside the others whenever the pool has room for their declared
+    CPUs and memory.
+
+    An interrupt (Ctrl-C) stops the run at once: `on_interrupt` is called to
+    unblock the tasks in flight, and the workers are not waited for.
+    """
+
+    def __init__(
+        self,
+        tasks: Iterable[Task],
+        max_parallel: int = 1,
+        limits: Optional[Dict[str, int]] = None,
+        lookahead: int = LOOKAHEAD,
+        on_failure: str = "abort",
+        local_pool: Optional["LocalPool"] = None,
+    ):
+        self._source = iter(tasks)
+        self.tasks: List[Task] = []
+        self.max_parallel = max_parallel
+        self.limits = InFlightLimits(limits or {})
+        self.lookahead = lookahead
+        self.on_failure = on_failure
+        self.local_pool = local_pool
+        self.aborted = False
+        # Running tasks that hold one of the `max_parallel` slots.
+        self._slots_used = 0
+
+    def _is_local(self, task: Task) -> bool:
+        return self.local_pool is not None and task.command.raw
+
+    def _has_capacity(self) -> bool:
+        return self._slots_used < self.max_parallel or (
+            self.local_pool is not None and self.local_pool.has_room
+        )
+
+    def _ready(self, task: Task) -> bool:
+        return task.status is None and all(
+            d < len(self.tasks) and self.tasks[d].status in SATISFIED_STATUSES for d in task.deps
+        )
+
+    def _doomed(self, task: Task) -> bool:
+        """Whether a dependency failed or was skipped, so `task` can never start."""
+        return any(
+            d < len(self.tasks) and self.tasks[d].status in (*FAILED_STATUSES, "skipped")
+            for d in task.deps
+        )
+
+    def run(
+        self,
+        run_task: Callable[[Task], str],
+        on_error: Optional[Callable[[Task, Exception], None]] = None,
+        on_interrupt: Optional[Callable[[], None]] = None,
+    ) -> List[Task]:
+        """Run every task through `run_task` and return the tasks with final statuses."""
+        running: Dict[Future, Task] = {}
+        # Pulled from the source but not started yet, waiting on dependencies or limits.
+        blocked: List[Task] = []
+        # Tasks waiting to be retried: (not_before, index, task, status of the last attempt).
+        delayed: List[Tuple[float, int, Task, str]] = []
+
+        def try_start(task: Task) -> bool:
+            if self._doomed(task):
+                task.status = "skipped"
+                return True
+            local = self._is_local(task)
+            if not local and self._slots_used >= self.max_parallel:
+                return False
+            if not self._ready(task) or not self.limits.try_acquire(task):
+                return False
+            if local and not self.local_pool.try_acquire(task):
+                self.limits.release(task)
+                return False
+            if not local:
+                self._slots_used += 1
+            task.status = "running"
+            running[pool.submit(run_task, task)] = task
+            return True
+
+        workers = self.max_parallel + (self.local_pool.cpus if self.local_pool is not None else 0)
+        pool = ThreadPoolExecutor(max_workers=workers)
+        try:
+            while True:
+                if not self.aborted:
+                    # Due retries go first, ahead of tasks that haven't run at all.
+                    while delayed and delayed[0][0] <= time.monotonic():
+                        blocked.insert(0, heapq.heappop(delayed)[2])
+
+                    still_blocked = []
+                    for task in blocked:
+                        if not self._has_capacity() or not try_start(task):
+                            still_blocked.append(task)
+                    blocked = still_blocked
+
+                    # With nothing running, keep pulling past the lookahead: whatever
+                    # unblocks the waiting tasks must still be in the source.
+                    while self._has_capacity() and (
+                        len(blocked) < self.lookahead or not (running or delayed)
+                    ):
+                        task = next(self._source, None)
+                        if task is None:
+                            break
+                        self.tasks.append(task)
+                        if task.status is not None:
+                            continue
+                        if not try_start(task):
+                            blocked.append(task)
+
+                if not running:
+                    if not delayed or self.aborted:
+                        break
+                    time.sleep(max(0.0, delayed[0][0] - time.monotonic()))
+                    continue
+
+                timeout = max(0.0, delayed[0][0] - time.monotonic()) if delayed else None
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    self.limits.release(task)
+                    if self._is_local(task):
+                        self.local_pool.release(task)
+                    else:
+                        self._slots_used -= 1
+                    try:
+                        status = future.result()
+                    except Exception as e:
+                        status = "failed"
+                        task.not_before = None
+                        if on_error is not None:
+                            on_error(task, e)
+                    if task.not_before is not None:
+                        heapq.heappush(delayed, (task.not_before, task.index, task, status))
+                        task.not_before = None
+                        task.status = None
+                        continue
+                    task.status = status
+                    if task.status in FAILED_STATUSES and self.on_failure == "abort":
+                        self.aborted = True
+        except BaseException:
+            # Joining the pool would wait on workers still blocked in their tasks.
+            self.aborted = True
+            if on_interrupt is not None:
+                on_interrupt()
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        pool.shutdown()
+
+        # Retries still waiting when the run aborted keep their last attempt's status.
+        for _, _, task, status in delayed:
+            task.status = status
+        # Whatever was never pulled (after an abort) is skipped too.
+        self.tasks.extend(self._source)
+        for task in self.tasks:
+            if task.status is None:
+                task.status = "skipped"
+
+        return self.tasks
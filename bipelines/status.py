@@ -0,0 +1,7 @@
+"""Task status groups, kept in a leaf module so offline tools can import them cheaply."""
+
+# Statuses that let dependent tasks start.
+SATISFIED_STATUSES = ("completed", "dry_run")
+FAILED_STATUSES = ("failed", "canceled")
+# Experiment statuses that can no longer change.
+TERMINAL_STATUSES = ("completed", "failed", "canceled")
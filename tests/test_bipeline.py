@@ -0,0 +1,75 @@
+import time
+
+from bipelines.bench import WORKSPACE, BenchBipeline
+from bipelines.bipeline import _hash_tag
+from bipelines.config import BipelineConfig, CommandConfig
+from bipelines.fake_beaker import FakeBeaker, SimClock
+from bipelines.journal import RunJournal
+
+# Simulated seconds per real second: a 60s experiment takes 60ms.
+SCALE = 1000.0
+
+
+def _fake(**kwargs) -> FakeBeaker:
+    kwargs = {"latency": 0.01, "queue_time": 10.0, "run_time": 60.0, **kwargs}
+    return FakeBeaker(clock=SimClock(scale=SCALE), **kwargs)
+
+
+def _config(tmp_path, commands, **kwargs) -> BipelineConfig:
+    config = BipelineConfig(
+        commands=commands,
+        workspace=WORKSPACE,
+        run_hash="test",
+        state_dir=str(tmp_path),
+        local_env_dir=str(tmp_path),
+        poll_interval=0.01,
+        api_rps=None,
+        dashboard="off",
+        **kwargs,
+    )
+    config.validate()
+    return config
+
+
+def _launched(beaker: FakeBeaker, index: int) -> int:
+    return sum(1 for r in beaker._ordered if r.name == f"bench-{index}")
+
+
+def test_resumed_run_reattaches_to_journaled_experiments(tmp_path):
+    beaker = _fake()
+    config = _config(tmp_path, [CommandConfig(command=f"python launch.py {i}") for i in range(2)])
+    first_hash = config.task_hash(config.commands[0])
+
+    # A previous run launched task 0 and died before it finished.
+    exp_id = beaker.submit(name="earlier-run", description=_hash_tag(first_hash))
+    journal = RunJournal(config.journal_path)
+    journal.record(first_hash, "launched", experiment_id=exp_id, created=time.time())
+    journal.close()
+
+    results = BenchBipeline(config, beaker, launch_time=1.0).run()
+
+    assert [r["status"] for r in results] == ["completed", "completed"]
+    assert results[0]["attempts"][0]["experiment_id"] == exp_id
+    assert _launched(beaker, 0) == 0
+    assert _launched(beaker, 1) == 1
+
+
+def test_failed_task_is_retried_and_others_keep_running(tmp_path):
+    beaker = _fake(failure_rate=1.0)
+    config = _config(
+        tmp_path,
+        [
+            CommandConfig(command="python launch.py flaky", retries=2, retry_backoff=0.01),
+            CommandConfig(command="python launch.py other"),
+        ],
+        max_parallel=1,
+        on_failure="continue",
+    )
+
+    results = BenchBipeline(config, beaker, launch_time=1.0).run()
+
+    assert [r["status"] for r in results] == ["failed", "failed"]
+    assert [a["status"] for a in results[0]["attempts"]] == ["failed"] * 3
+    assert len({a["experiment_id"] for a in results[0]["attempts"]}) == 3
+    assert _launched(beaker, 0) == 3
+    assert _launched(beaker, 1) == 1
@@ -0,0 +1,130 @@
+import pytest
+
+from bipelines.config import BipelineConfig, CommandConfig, SweepConfig, load_config_from_dict
+
+
+def _brute_positions(sweep, name):
+    return [i for i, cmd in enumerate(sweep.expand()) if cmd.name == name]
+
+
+SWEEPS = {
+    "grid": SweepConfig(
+        command="train --lr {lr} --bs {bs}",
+        name="p-{lr}-{bs}",
+        grid={"lr": [0.1, 0.01, 0.001], "bs": [8, 16]},
+    ),
+    "grid+zip": SweepConfig(
+        command="eval {model} {task} {shots}",
+        name="{model}/{task}/{shots}",
+        grid={"model": ["a", "b"]},
+        zip={"task": ["x", "y", "z"], "shots": [0, 1, 5]},
+    ),
+    "samples": SweepConfig(
+        command="run {a} {b} {c}",
+        name="s-{a}-{b}-{c}",
+        grid={"a": list(range(10)), "b": list(range(10)), "c": list(range(10))},
+        samples=37,
+        seed=3,
+    ),
+    "format spec": SweepConfig(
+        command="train --lr {lr}",
+        name="lr{lr:.0e}",
+        grid={"lr": [1e-3, 3e-4, 1e-4]},
+    ),
+    # "1"/"10" style values: "p1101" is a=1,b=101 or a=110,b=1, so parsing has to backtrack.
+    "ambiguous": SweepConfig(
+        command="run {a} {b}",
+        name="p{a}{b}",
+        grid={"a": [1, 10, 110], "b": [1, 10, 101]},
+    ),
+    # A template that leaves an axis out names several points the same.
+    "partial name": SweepConfig(
+        command="run {a} {b}",
+        name="only-{a}",
+        grid={"a": [1, 2], "b": [3, 4, 5]},
+    ),
+}
+
+
+@pytest.mark.parametrize("kind", SWEEPS)
+def test_sweep_positions_round_trip(kind):
+    sweep = SWEEPS[kind]
+    names = {cmd.name for cmd in sweep.expand()}
+    for name in names:
+        assert sweep.positions(name, limit=sweep.size) == _brute_positions(sweep, name)
+    for position, cmd in enumerate(sweep.expand()):
+        assert sweep.command_at(position) == cmd
+    assert sweep.positions("no-such-point") == []
+
+
+def test_ambiguous_values_resolve_to_every_matching_point():
+    sweep = SWEEPS["ambiguous"]
+    assert len(_brute_positions(sweep, "p1101")) == 2
+    assert sweep.positions("p1101") == _brute_positions(sweep, "p1101")
+    assert sweep.positions("p1101", limit=1) == _brute_positions(sweep, "p1101")[:1]
+
+
+def test_config_find_and_command_at_cover_commands_and_sweeps():
+    cfg = BipelineConfig(
+        commands=[CommandConfig(command="prep", name="prep")],
+        sweeps=[SWEEPS["grid"], SWEEPS["samples"]],
+    )
+    for index, cmd in enumerate(cfg.iter_commands()):
+        assert cfg.command_at(index) == cmd
+        assert cfg.find(cmd.name) == [index]
+
+
+def test_unknown_after_is_rejected():
+    with pytest.raises(ValueError, match="unknown command 'missing'"):
+        load_config_from_dict(
+            {"commands": [{"command": "a", "name": "a"}, {"command": "b", "after": ["missing"]}]}
+        )
+
+
+def test_dependency_cycle_is_rejected():
+    with pytest.raises(ValueError, match="cycle"):
+        load_config_from_dict(
+            {
+                "commands": [
+                    {"command": "a", "name": "a", "after": ["c"]},
+                    {"command": "b", "name": "b", "after": ["a"]},
+                    {"command": "c", "name": "c", "after": ["b"]},
+                ]
+            }
+        )
+
+
+def test_cycle_through_a_sweep_is_rejected():
+    with pytest.raises(ValueError, match="cycle"):
+        load_config_from_dict(
+            {
+                "commands": [{"command": "report", "name": "report", "after": ["p-0.1-8"]}],
+                "sweep": {
+                    "command": "train {lr} {bs}",
+                    "name": "p-{lr}-{bs}",
+                    "grid": {"lr": [0.1], "bs": [8, 16]},
+                    "after": ["report"],
+                },
+            }
+        )
+
+
+def test_self_dependency_is_rejected():
+    with pytest.raises(ValueError, match="depends on itself"):
+        load_config_from_dict({"commands": [{"command": "a", "name": "a", "after": ["a"]}]})
+
+
+def test_dependency_resolver_points_at_sweep_points():
+    cfg = load_config_from_dict(
+        {
+            "commands": [{"command": "report", "name": "report", "after": ["p-0.01-16"]}],
+            "sweep": {
+                "command": "train {lr} {bs}",
+                "name": "p-{lr}-{bs}",
+                "grid": {"lr": [0.1, 0.01], "bs": [8, 16]},
+            },
+        }
+    )
+    dependencies = cfg.dependency_resolver()
+    (index,) = dependencies(cfg.commands[0])
+    assert cfg.command_at(index).name == "p-0.01-16"
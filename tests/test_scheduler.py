@@ -0,0 +1,137 @@
+import threading
+import time
+
+from bipelines.config import CommandConfig
+from bipelines.scheduler import DagScheduler, Task
+
+
+def _task(index, deps=(), **command):
+    return Task(
+        index=index,
+        command=CommandConfig(command=f"echo {index}", name=f"t{index}", **command),
+        hash=f"{index:012x}",
+        deps=list(deps),
+    )
+
+
+class _Recorder:
+    """A run_task that logs start/finish order and returns scripted statuses."""
+
+    def __init__(self, statuses=None, duration=0.01):
+        self.statuses = statuses or {}
+        self.duration = duration
+        self.lock = threading.Lock()
+        self.events = []
+        self.running = 0
+        self.peak = 0
+
+    def __call__(self, task):
+        with self.lock:
+            self.events.append(("start", task.index))
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.duration)
+        with self.lock:
+            self.running -= 1
+            self.events.append(("finish", task.index))
+        return self.statuses.get(task.index, "completed")
+
+    def started(self):
+        return [i for event, i in self.events if event == "start"]
+
+
+def test_tasks_start_after_their_dependencies_finish():
+    tasks = [_task(0), _task(1), _task(2, [0, 1]), _task(3, [2]), _task(4), _task(5, [3, 4])]
+    run = _Recorder()
+    DagScheduler(tasks, max_parallel=3).run(run)
+
+    assert all(t.status == "completed" for t in tasks)
+    order = {event: n for n, event in enumerate(run.events)}
+    for task in tasks:
+        for dep in task.deps:
+            assert order[("finish", dep)] < order[("start", task.index)]
+
+
+def test_failure_aborts_and_skips_everything_not_started():
+    tasks = [_task(0), _task(1, [0]), _task(2)]
+    scheduler = DagScheduler(tasks, max_parallel=1)
+    scheduler.run(_Recorder({0: "failed"}))
+
+    assert scheduler.aborted
+    assert [t.status for t in tasks] == ["failed", "skipped", "skipped"]
+
+
+def test_continue_skips_only_downstream_of_a_failure():
+    tasks = [_task(0), _task(1, [0]), _task(2), _task(3, [1])]
+    scheduler = DagScheduler(tasks, max_parallel=2, on_failure="continue")
+    scheduler.run(_Recorder({0: "failed"}))
+
+    assert not scheduler.aborted
+    assert [t.status for t in tasks] == ["failed", "skipped", "completed", "skipped"]
+
+
+def test_limits_cap_tasks_in_flight_per_key():
+    tasks = [_task(i, cluster="c") for i in range(6)]
+    run = _Recorder(duration=0.05)
+    DagScheduler(tasks, max_parallel=6, limits={"cluster:c": 2}).run(run)
+
+    assert run.peak == 2
+    assert all(t.status == "completed" for t in tasks)
+
+
+def test_retry_waits_without_holding_a_slot_or_limit():
+    tasks = [_task(0, cluster="c"), _task(1, cluster="c")]
+    calls = []
+    backoff = 0.3
+
+    def run(task):
+        calls.append((task.index, time.monotonic()))
+        if task.index == 0 and len(calls) == 1:
+            task.not_before = time.monotonic() + backoff
+            return "failed"
+        return "completed"
+
+    started = time.monotonic()
+    DagScheduler(tasks, max_parallel=1, limits={"cluster:c": 1}).run(run)
+
+    assert [i for i, _ in calls] == [0, 1, 0]
+    # Task 1 ran during task 0's backoff, and the retry waited it out.
+    assert calls[1][1] - started < backoff
+    assert calls[2][1] - started >= backoff
+    assert [t.status for t in tasks] == ["completed", "completed"]
+
+
+def test_retry_pending_at_an_abort_keeps_its_last_status():
+    tasks = [_task(0), _task(1)]
+
+    def run(task):
+        if task.index == 0:
+            task.not_before = time.monotonic() + 60
+            return "failed"
+        return "failed"
+
+    scheduler = DagScheduler(tasks, max_parallel=1)
+    started = time.monotonic()
+    scheduler.run(run)
+
+    assert time.monotonic() - started < 5
+    assert scheduler.aborted
+    assert [t.status for t in tasks] == ["failed", "failed"]
+
+
+def test_lazy_source_is_only_pulled_ahead_by_the_lookahead():
+    pulled = []
+
+    def source():
+        for i in range(50):
+            pulled.append(i)
+            yield _task(i)
+
+    def run(task):
+        # At most max_parallel running plus `lookahead` blocked tasks are held.
+        assert len(pulled) <= task.index + 1 + 2
+        return "completed"
+
+    scheduler = DagScheduler(source(), max_parallel=1, lookahead=2)
+    scheduler.run(run)
+    assert [t.index for t in scheduler.tasks] == list(range(50))